@@ -2,19 +2,46 @@
 
 Global variables are accessed in the context of a worker.
 """
-from asyncio import run
-from asyncio.tasks import as_completed
+from asyncio import AbstractEventLoop, gather, new_event_loop, set_event_loop
+from collections import deque
+from heapq import heappop, heappush
+from itertools import chain, groupby, islice
+from operator import itemgetter
+from os import getpid
 from pathlib import Path
-from typing import Any, Awaitable, Iterable, List, NamedTuple, Optional, Tuple
+from queue import Queue
+from threading import Semaphore
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 from pygit2 import Commit, Repository
 from uvloop import install
 
 from pyrepositoryminer.metrics import all_metrics
+from pyrepositoryminer.metrics.cache import UNBOUNDED, CacheStats, Memo, OidCache
+from pyrepositoryminer.metrics.cache import configure as configure_caches
+from pyrepositoryminer.metrics.cache import find_caches, find_memos, share_caches
+from pyrepositoryminer.metrics.context import CommitContext
 from pyrepositoryminer.metrics.diffblob.main import DiffBlobMetric, DiffBlobVisitor
 from pyrepositoryminer.metrics.diffdir.main import DiffDirMetric, DiffDirVisitor
 from pyrepositoryminer.metrics.dir.main import DirMetric, DirVisitor
 from pyrepositoryminer.metrics.nativeblob.main import (
+    NativeBlobFilter,
     NativeBlobMetric,
     NativeBlobVisitor,
 )
@@ -22,18 +49,46 @@ from pyrepositoryminer.metrics.nativetree.main import (
     NativeTreeMetric,
     NativeTreeVisitor,
 )
-from pyrepositoryminer.metrics.structs import Metric
-from pyrepositoryminer.output import CommitOutput, format_output, parse_commit
-from pyrepositoryminer.pobjects import Object
+from pyrepositoryminer.metrics.paths import PathFilter, SizeFilter
+from pyrepositoryminer.metrics.processes import configure as configure_processes
+from pyrepositoryminer.metrics.store import ResultStore
+from pyrepositoryminer.metrics.structs import Metric, NativeBlobMetricInput
+from pyrepositoryminer.metrics.utils import DiffOptions
+from pyrepositoryminer.output import CommitOutput, OutputBuilder, format_output
+from pyrepositoryminer.pobjects import Blob
+from pyrepositoryminer.pobjects import Commit as CommitObject
 
 
 class InitArgs(NamedTuple):
     repository: Path
     metrics: Tuple[str, ...]
     custom_metrics: Tuple[Any, ...]  # TODO make this a metric abc
+    store: Optional[Path] = None
+    fill_cached: bool = False
+    ledger: Optional[Any] = None  # proxy of the OidLedger shared by all workers
+    unordered: bool = False
+    changed_only: bool = False
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    max_blob_size: Optional[int] = None
+    worktree_dir: Optional[str] = None
+    persistent_worktree: bool = False
+    max_processes: Optional[int] = None
+    process_timeout: Optional[float] = None
+    diff_options: DiffOptions = DiffOptions()
+    oid_cache: str = UNBOUNDED
+    oid_cache_size: Optional[int] = None
+    cache_stats: bool = False
+
 
+MAX_BATCH_SIZE = 32
+MAX_PENDING_METRICS = 64  # per commit, the metrics awaited at once
+SELECT_CHUNK_SIZE = 256  # the blobs filtered at once
+
+T = TypeVar("T")
 
 # pylint: disable=global-statement
+loop: AbstractEventLoop
 repo: Repository
 native_blob_metrics: Tuple[Any, ...]
 native_blob_visitor: NativeBlobVisitor
@@ -45,74 +100,543 @@ dir_metrics: Tuple[Any, ...]
 dir_visitor: DirVisitor
 diffdir_visitor: DiffDirVisitor
 diffdir_metrics: Tuple[Any, ...]
+store: Optional[ResultStore]
+ledger: Optional[Any]
+cache_stats: bool
+unordered: bool
+paths: Optional[PathFilter]
+sizes: Optional[SizeFilter]
+diff_options: DiffOptions
 
 
-async def categorize_metrics(
-    *futures: Awaitable[Iterable[Metric]],
-) -> Tuple[Iterable[Metric], Iterable[Metric], Iterable[Metric]]:
-    toplevel = []
-    objectlevel = []
-    subobjectlevel = []
-    for future in as_completed(futures):
-        for metric in await future:
-            if metric.object is None:
-                toplevel.append(metric)
-            elif metric.subobject is None:
-                objectlevel.append(metric)
-            else:
-                subobjectlevel.append(metric)
-    return toplevel, objectlevel, subobjectlevel
+async def drain_metrics(
+    futures: Iterable[Awaitable[Iterable[Metric]]],
+    add: Callable[[Iterable[Metric]], Any],
+    max_pending: int = MAX_PENDING_METRICS,
+) -> None:
+    # the futures are created lazily, at most max_pending are awaited at once
+    pending = iter(futures)
 
+    async def drain(first: Awaitable[Iterable[Metric]]) -> None:
+        add(await first)
+        for future in pending:
+            add(await future)
 
-async def analyze(commit_id: str) -> Optional[CommitOutput]:
+    await gather(*map(drain, islice(pending, max_pending)))
+
+
+async def gather_metrics(
+    futures: Iterable[Awaitable[Iterable[Metric]]],
+    max_pending: int = MAX_PENDING_METRICS,
+) -> List[Metric]:
+    metrics: List[Metric] = []
+    await drain_metrics(futures, metrics.extend, max_pending)
+    return metrics
+
+
+Selection = Tuple[Tuple[NativeBlobMetricInput, ...], List[List[bool]]]
+
+
+def select_chunks(
+    metrics: Tuple[Any, ...],
+    tups: Iterable[NativeBlobMetricInput],
+    filters: Optional[Sequence[Any]] = None,
+) -> Iterator[Selection]:
+    # the blobs are filtered chunk by chunk as the visitor yields them
+    filters = [m.filter for m in metrics] if filters is None else filters
+    iterator = iter(tups)
+    while chunk := tuple(islice(iterator, SELECT_CHUNK_SIZE)):
+        yield chunk, [
+            f.select(chunk, release=False)
+            if isinstance(f, NativeBlobFilter)
+            else [f(tup) for tup in chunk]
+            for f in filters
+        ]
+
+
+def iter_selected(
+    metrics: Tuple[Any, ...], selections: Iterable[Selection]
+) -> Iterator[Tuple[Any, NativeBlobMetricInput]]:
+    for chunk, filtered in selections:
+        yield from (
+            (m, tup)
+            for i, tup in enumerate(chunk)
+            for m, f in zip(metrics, filtered)
+            if not f[i]
+        )
+
+
+def select_blobs(
+    metrics: Tuple[Any, ...],
+    tups: Iterable[NativeBlobMetricInput],
+    filters: Optional[Sequence[Any]] = None,
+) -> Iterator[Tuple[Any, NativeBlobMetricInput]]:
+    return iter_selected(metrics, select_chunks(metrics, tups, filters))
+
+
+def blob_futures(
+    selected: Iterable[Tuple[Any, NativeBlobMetricInput]]
+) -> Iterator[Awaitable[Iterable[Metric]]]:
+    # the blobs of a metric with a batch size are analyzed in batches
+    batches: Dict[int, Tuple[Any, List[NativeBlobMetricInput]]] = {}
+    for m, tup in selected:
+        if m.batch_size is None:
+            yield m(tup)
+            continue
+        _, batch = batches.setdefault(id(m), (m, []))
+        batch.append(tup)
+        if len(batch) >= m.batch_size:
+            yield m.batch(tuple(batch))
+            batch.clear()
+    yield from (m.batch(tuple(batch)) for m, batch in batches.values() if batch)
+
+
+def get_commit(commit_id: str) -> Optional[Commit]:
     try:
         commit = repo.get(commit_id)
     except ValueError:
         return None
-    else:
-        if commit is None or not isinstance(commit, Commit):
-            return None
-    root = Object.from_pobject(commit)
-    futures: List[Awaitable[Iterable[Metric]]] = []
-    if native_blob_metrics:
-        futures.extend(
-            m(blob_tup)
-            for blob_tup in native_blob_visitor(root)
-            for m in native_blob_metrics
-            if not m.filter(blob_tup)
+    if commit is None or not isinstance(commit, Commit):
+        return None
+    return commit
+
+
+async def analyze_commit(
+    commit: Commit, add: Callable[[Iterable[Metric]], Any], native_blobs: bool = True
+) -> None:
+    root = CommitObject(commit)
+    context = CommitContext(root, paths, sizes, diff_options)
+    futures: List[Iterable[Awaitable[Iterable[Metric]]]] = []
+    selections: List[Tuple[Tuple[Any, ...], Iterable[Selection]]] = []
+    if native_blob_metrics and native_blobs:
+        tups = native_blob_visitor(root, context)
+        selections.append(
+            (native_blob_metrics, select_chunks(native_blob_metrics, tups))
         )
     if diff_blob_metrics:
-        futures.extend(
-            m(blob_tup)
-            for blob_tup in diff_blob_visitor(root)
-            for m in diff_blob_metrics
-            if not m.filter(blob_tup)
-        )
+        tups = diff_blob_visitor(root, context)
+        selections.append((diff_blob_metrics, select_chunks(diff_blob_metrics, tups)))
+    if ledger is not None:
+        # a shared cache holds the turn from the first claim to the release,
+        # so the blobs are claimed and filtered before the metrics are computed
+        selections = [(metrics, tuple(chunks)) for metrics, chunks in selections]
+    for blob_filter in {
+        id(m.filter): m.filter
+        for m in (*(native_blob_metrics if native_blobs else ()), *diff_blob_metrics)
+    }.values():
+        if isinstance(blob_filter, NativeBlobFilter):
+            blob_filter.cached_oids.release()
+    for metrics, chunks in selections:
+        futures.append(blob_futures(iter_selected(metrics, chunks)))
     if native_tree_metrics:
-        tree_tup = native_tree_visitor(root)
-        futures.extend(m(tree_tup) for m in native_tree_metrics)
+        tree_tup = native_tree_visitor(root, context)
+        futures.append(m(tree_tup) for m in native_tree_metrics)
     if dir_metrics:
-        dir_tup = dir_visitor(root)
-        futures.extend(m(dir_tup) for m in dir_metrics)
+        dir_tup = dir_visitor(root, context)
+        futures.append(m(dir_tup) for m in dir_metrics)
     if diffdir_metrics:
-        diffdir_tup = diffdir_visitor(root)
-        futures.extend(m(diffdir_tup) for m in diffdir_metrics)
-    mets = await categorize_metrics(*futures)
+        diffdir_tup = diffdir_visitor(root, context)
+        futures.append(m(diffdir_tup) for m in diffdir_metrics)
+    await drain_metrics(chain.from_iterable(futures), add)
     if dir_metrics:
         dir_visitor.close()
     if diffdir_metrics:
         diffdir_visitor.close()
-    return parse_commit(commit, *mets)
+    if store is not None:
+        store.flush()
+
+
+async def analyze(commit_id: str) -> Optional[CommitOutput]:
+    commit = get_commit(commit_id)
+    if commit is None:
+        return None
+    output = OutputBuilder()
+    await analyze_commit(commit, output.add)
+    return output.build(commit)
+
+
+class BlobTask(NamedTuple):
+    oid: str
+    path: str
+    metrics: Tuple[int, ...]  # indices of the native blob metrics to compute
+
+
+class BlobWalk:
+    """Walk the native blobs of commits in order, with caches of its own."""
+
+    def __init__(self) -> None:
+        self.visitor = NativeBlobVisitor(native_blob_visitor.changed_only)
+        self.filters = [
+            NativeBlobFilter(*m.filter.filters)
+            if isinstance(m.filter, NativeBlobFilter)
+            else m.filter
+            for m in native_blob_metrics
+        ]
+
+    def __call__(
+        self, commit: Commit
+    ) -> Iterable[Tuple[NativeBlobMetricInput, Tuple[int, ...]]]:
+        root = CommitObject(commit)
+        context = CommitContext(root, paths, sizes, diff_options)
+        indices = {id(m): i for i, m in enumerate(native_blob_metrics)}
+        selected = select_blobs(
+            native_blob_metrics, self.visitor(root, context), self.filters
+        )
+        # the metrics of a blob are selected one after another
+        return (
+            (tup, tuple(indices[id(m)] for m, _ in pairs))
+            for tup, pairs in groupby(selected, itemgetter(1))
+        )
+
+
+class BlobEngine:
+    # plans the blobs of a round in the parent, so the workers only compute
+    # blobs seen for the first time, and merges in the per commit metrics
+
+    def __init__(self, commit_ids: Sequence[str], chunk_size: int) -> None:
+        self.commit_ids = commit_ids
+        self.chunk_size = chunk_size
+        self.planner = BlobWalk()
+        self.assembler = BlobWalk()
+        self.results: Dict[str, List[Metric]] = {}
+        self.tasks: "Queue[Optional[Sequence[Any]]]" = Queue()
+        self.sent: Deque[Tuple[int, int, int]] = deque()  # chunks, batches, commits
+        self.in_flight = 0
+
+    def plan(self, commit_ids: Iterable[str]) -> Iterator[BlobTask]:
+        for commit_id in commit_ids:
+            commit = get_commit(commit_id)
+            if commit is None:
+                continue
+            for tup, metrics in self.planner(commit):
+                if not tup.is_cached:
+                    yield BlobTask(tup.blob.id, tup.path, metrics)
+
+    def send(self, batches: Tuple[Tuple[Tuple[int, str], ...], ...]) -> None:
+        tasks = sorted(chain.from_iterable(batches))
+        planned = self.plan(commit_id for _, commit_id in tasks)
+        chunks = 0
+        while chunk := tuple(islice(planned, self.chunk_size)):
+            self.tasks.put(chunk)
+            chunks += 1
+        for batch in batches:
+            self.tasks.put(batch)
+        self.sent.append((chunks, len(batches), len(tasks)))
+        self.in_flight += len(tasks)
+
+    def receive(
+        self, results: Iterator[Sequence[Tuple[Any, Optional[List[Metric]]]]]
+    ) -> Iterator[str]:
+        chunks, batches, commits = self.sent.popleft()
+        for oid, metrics in chain.from_iterable(islice(results, chunks)):
+            self.results[oid] = metrics  # type: ignore
+        for index, metrics in sorted(
+            chain.from_iterable(islice(results, batches)), key=itemgetter(0)
+        ):
+            commit = get_commit(self.commit_ids[index])
+            if metrics is None or commit is None:
+                continue
+            yield format_output(loop.run_until_complete(self.assemble(commit, metrics)))
+        self.in_flight -= commits
+
+    async def assemble(self, commit: Commit, metrics: Iterable[Metric]) -> CommitOutput:
+        output = OutputBuilder()
+        output.add(metrics)
+        cached = self.iter_cached(commit, output)
+        await drain_metrics(blob_futures(cached), output.add)
+        return output.build(commit)
+
+    def iter_cached(
+        self, commit: Commit, output: OutputBuilder
+    ) -> Iterator[Tuple[Any, NativeBlobMetricInput]]:
+        # the results of the planned blobs are output on the way
+        for tup, indices in self.assembler(commit):
+            if tup.is_cached:
+                yield from ((native_blob_metrics[i], tup) for i in indices)
+            else:
+                output.add(self.results.pop(tup.blob.id, ()))
+
+
+def iter_rounds(
+    tasks: Iterable[T],
+    workers: int,
+    batch_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[Tuple[Tuple[T, ...], ...]]:
+    """Deal the tasks to the workers in rounds of one batch per worker.
+
+    A batch takes every n-th task of its round, so consecutive commits are
+    analyzed by different workers at the same time and the ordered claims of
+    the shared caches do not serialize the workers. Without a batch size, the
+    batches double from 1 up to MAX_BATCH_SIZE. A round never holds more tasks
+    than may be in flight.
+    """
+    size = 1 if batch_size is None else max(batch_size, 1)
+    if max_in_flight is not None:
+        workers = min(workers, max_in_flight)
+        size = min(size, max_in_flight // workers)
+    iterator = iter(tasks)
+    while tasks_round := tuple(islice(iterator, size * workers)):
+        yield tuple(
+            batch
+            for batch in (tasks_round[i::workers] for i in range(workers))
+            if batch
+        )
+        if batch_size is None:
+            size = min(2 * size, MAX_BATCH_SIZE)
+            if max_in_flight is not None:
+                size = min(size, max_in_flight // workers)
+
+
+def iter_batches(
+    tasks: Iterable[T],
+    workers: int,
+    batch_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[Tuple[T, ...]]:
+    return chain.from_iterable(iter_rounds(tasks, workers, batch_size, max_in_flight))
+
+
+def iter_bounded(
+    batches: Iterable[Tuple[T, ...]], in_flight: Optional[Semaphore]
+) -> Iterator[Tuple[T, ...]]:
+    # the pool consumes the tasks in a thread, which blocks here
+    for batch in batches:
+        if in_flight is not None:
+            for _ in range(len(batch)):
+                in_flight.acquire()  # pylint: disable=consider-using-with
+        yield batch
+
+
+def iter_released(
+    batches: Iterable[List[Tuple[int, T]]], in_flight: Optional[Semaphore]
+) -> Iterator[Tuple[int, T]]:
+    for batch in batches:
+        if in_flight is not None:
+            for _ in range(len(batch)):
+                in_flight.release()
+        yield from batch
+
+
+def iter_in_order(results: Iterable[Tuple[int, T]]) -> Iterator[Tuple[int, T]]:
+    heap: List[Tuple[int, Any]] = []
+    next_index = 0
+    for result in results:
+        heappush(heap, result)
+        while heap and heap[0][0] == next_index:
+            yield heappop(heap)
+            next_index += 1
+    while heap:
+        yield heappop(heap)
+
+
+def blob_worker(task: BlobTask) -> Tuple[str, List[Metric]]:
+    tup = NativeBlobMetricInput(False, task.path, Blob(repo[task.oid]))
+    metrics = loop.run_until_complete(
+        gather_metrics(native_blob_metrics[i](tup) for i in task.metrics)
+    )
+    if store is not None:
+        store.flush()
+    return task.oid, metrics
+
+
+def commit_worker(
+    tasks: Sequence[Tuple[int, str]]
+) -> List[Tuple[int, Optional[List[Metric]]]]:
+    results: List[Tuple[int, Optional[List[Metric]]]] = []
+    finished = 0
+    try:
+        for index, commit_id in tasks:
+            OidCache.index = index
+            commit = get_commit(commit_id)
+            metrics: Optional[List[Metric]] = None
+            if commit is not None:
+                metrics = []
+                loop.run_until_complete(analyze_commit(commit, metrics.extend, False))
+            results.append((index, metrics))
+            finish(index)
+            finished += 1
+    finally:
+        finish_all(tasks[finished:])
+    return results
+
+
+def worker(tasks: Sequence[Tuple[int, str]]) -> List[Tuple[int, Optional[str]]]:
+    results: List[Tuple[int, Optional[str]]] = []
+    finished = 0
+    try:
+        for index, commit_id in tasks:
+            OidCache.index = index
+            output = loop.run_until_complete(analyze(commit_id))
+            finish(index)
+            finished += 1
+            if output is not None and unordered:
+                output["index"] = index
+            results.append((index, None if output is None else format_output(output)))
+    finally:
+        finish_all(tasks[finished:])
+    report_memos()
+    return results
+
+
+def blob_engine_worker(
+    tasks: Sequence[Any],
+) -> Sequence[Tuple[Any, Optional[List[Metric]]]]:
+    # a chunk of the planned blobs, or a batch of commits
+    if isinstance(tasks[0], BlobTask):
+        return list(map(blob_worker, tasks))
+    return commit_worker(tasks)
+
+
+def run_blob_engine(
+    pool: Any,
+    commit_ids: Sequence[str],
+    workers: int = 1,
+    batch_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+) -> Iterator[str]:
+    engine = BlobEngine(commit_ids, batch_size or MAX_BATCH_SIZE)
+    results = pool.imap(blob_engine_worker, iter(engine.tasks.get, None))
+    try:
+        for batches in iter_rounds(
+            enumerate(commit_ids), workers, batch_size, max_in_flight
+        ):
+            size = sum(map(len, batches))
+            # the next round is sent while the round before it is analyzed
+            while engine.sent and (
+                len(engine.sent) > 1
+                or max_in_flight is not None
+                and engine.in_flight + size > max_in_flight
+            ):
+                yield from engine.receive(results)
+            engine.send(batches)
+        while engine.sent:
+            yield from engine.receive(results)
+    finally:
+        engine.tasks.put(None)  # ends the iteration of the tasks by the pool
+
+
+def run_commit_engine(
+    pool: Any,
+    commit_ids: Iterable[str],
+    workers: int = 1,
+    batch_size: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    unordered: bool = False,
+    start: int = 0,
+    progress: Optional[Callable[[int], None]] = None,
+) -> Iterator[str]:
+    in_flight = None if max_in_flight is None else Semaphore(max_in_flight)
+    batches = iter_batches(
+        enumerate(commit_ids, start), workers, batch_size, max_in_flight
+    )
+    imap = pool.imap_unordered if unordered else pool.imap
+    results = iter_released(imap(worker, iter_bounded(batches, in_flight)), in_flight)
+    for index, output in results if unordered else iter_in_order(results):
+        if output is not None:
+            yield output
+        if progress is not None:  # the outputs up to index were consumed
+            progress(index + 1)
+
+
+def cache_owners() -> Iterator[Tuple[str, Any]]:
+    yield "nativeblobvisitor", native_blob_visitor
+    yield "diffblobvisitor", diff_blob_visitor
+    yield "nativetreevisitor", native_tree_visitor
+    yield "dirvisitor", dir_visitor
+    yield "diffdirvisitor", diffdir_visitor
+    # sorted, so a filter of several metrics is always named after the same one
+    blob_metrics = sorted(
+        (*native_blob_metrics, *diff_blob_metrics), key=lambda m: str(m.name)
+    )
+    for metric in blob_metrics:
+        if isinstance(metric.filter, NativeBlobFilter):
+            yield f"{metric.name}:filter", metric.filter
+    for metric in (
+        *native_blob_metrics,
+        *diff_blob_metrics,
+        *native_tree_metrics,
+        *dir_metrics,
+        *diffdir_metrics,
+    ):
+        yield metric.name, metric
+
+
+def iter_caches() -> Iterator[Tuple[str, OidCache]]:
+    seen: Set[int] = set()
+    for prefix, owner in cache_owners():
+        for _, name, cache in find_caches(owner, prefix):
+            if id(cache) not in seen:
+                seen.add(id(cache))
+                yield name, cache
+
+
+def iter_memos() -> Iterator[Tuple[str, Memo[Any, Any]]]:
+    seen: Set[int] = set()
+    owners = (*cache_owners(), *(() if sizes is None else (("sizefilter", sizes),)))
+    for prefix, owner in owners:
+        for name, memo in find_memos(owner, prefix):
+            if id(memo) not in seen:
+                seen.add(id(memo))
+                yield name, memo
+
+
+def stat_memos() -> Dict[str, CacheStats]:
+    return {name: memo.stats() for name, memo in iter_memos()}
+
+
+def report_memos() -> None:
+    # the parent reads the stats of the memos of the workers from the ledger
+    if cache_stats and ledger is not None:
+        ledger.report(getpid(), stat_memos())
+
+
+def snapshot_caches(start: int, stop: int) -> Dict[str, List[str]]:
+    """Return the oids first claimed by the commits from start to stop by cache."""
+    if ledger is not None:
+        return dict(ledger.snapshot(start, stop))
+    return {name: cache.snapshot(start, stop) for name, cache in iter_caches()}
+
+
+def stat_caches() -> Dict[str, CacheStats]:
+    """Return the hits, misses and memory use by cache and memo."""
+    if ledger is not None:
+        return dict(ledger.stats())
+    return {
+        **{name: cache.stats() for name, cache in iter_caches()},
+        **stat_memos(),
+    }
+
+
+def restore_caches(index: int, caches: Mapping[str, Iterable[str]]) -> None:
+    """Restore the caches to continue with commit index."""
+    if ledger is not None:
+        ledger.restore(index, caches)
+        return
+    for name, cache in iter_caches():
+        cache.restore(caches.get(name, ()))
+
+
+def finish(index: int) -> None:
+    if ledger is not None:
+        ledger.finish(index)
+
+
+def finish_all(tasks: Sequence[Tuple[int, str]]) -> None:
+    # the turns of a batch left by an error, the other workers wait for them
+    for index, _ in tasks:
+        finish(index)
 
 
 def initialize(init_args: InitArgs) -> None:
     install()
-    global repo
+    global loop, repo
     global native_blob_metrics, native_blob_visitor
     global diff_blob_metrics, diff_blob_visitor
     global native_tree_metrics, native_tree_visitor
     global dir_metrics, dir_visitor
     global diffdir_metrics, diffdir_visitor
+    global store, ledger, cache_stats, unordered, paths, sizes, diff_options
 
     def get_metrics(superclass) -> Tuple:  # type: ignore
         return tuple(
@@ -124,21 +648,46 @@ def initialize(init_args: InitArgs) -> None:
             + [m() for m in init_args.custom_metrics if issubclass(m, superclass)]
         )
 
+    loop = new_event_loop()
+    set_event_loop(loop)
+    configure_processes(init_args.max_processes, init_args.process_timeout)
+    configure_caches(init_args.oid_cache, init_args.oid_cache_size)
     repo = Repository(init_args.repository)
     native_blob_metrics = get_metrics(NativeBlobMetric)
-    native_blob_visitor = NativeBlobVisitor()
+    native_blob_visitor = NativeBlobVisitor(init_args.changed_only)
     diff_blob_metrics = get_metrics(DiffBlobMetric)
     diff_blob_visitor = DiffBlobVisitor(repo)
     native_tree_metrics = get_metrics(NativeTreeMetric)
     native_tree_visitor = NativeTreeVisitor()
     dir_metrics = get_metrics(DirMetric)
-    dir_visitor = DirVisitor(repo)
+    dir_visitor = DirVisitor(
+        repo, init_args.worktree_dir, init_args.persistent_worktree
+    )
     diffdir_metrics = get_metrics(DiffDirMetric)
-    diffdir_visitor = DiffDirVisitor(repo)
-
-
-def worker(commit_id: str) -> Optional[str]:
-    output = run(analyze(commit_id))
-    if output is None:
-        return None
-    return format_output(output)
+    diffdir_visitor = DiffDirVisitor(repo, init_args.worktree_dir)
+    store = None if init_args.store is None else ResultStore(init_args.store)
+    paths = None
+    if init_args.include or init_args.exclude:
+        paths = PathFilter(init_args.include, init_args.exclude)
+    sizes = None
+    if init_args.max_blob_size is not None:
+        sizes = SizeFilter(repo.odb, init_args.max_blob_size)
+    diff_options = init_args.diff_options
+    scope = "".join(str(f) for f in (paths, sizes) if f is not None) or None
+    for metric in (
+        *native_blob_metrics,
+        *diff_blob_metrics,
+        *native_tree_metrics,
+        *dir_metrics,
+        *diffdir_metrics,
+    ):
+        metric.store = store
+        metric.fill_cached = init_args.fill_cached
+    for metric in (*native_tree_metrics, *dir_metrics, *diffdir_metrics):
+        metric.scope = scope
+    unordered = init_args.unordered
+    ledger = init_args.ledger
+    cache_stats = init_args.cache_stats
+    if ledger is not None:
+        for prefix, owner in cache_owners():
+            share_caches(owner, ledger, prefix)
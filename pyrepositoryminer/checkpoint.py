@@ -0,0 +1,75 @@
+from json import dumps
+from pathlib import Path
+from sqlite3 import connect
+from typing import Dict, List, Mapping, Optional, Sequence
+
+
+class Checkpoint:
+    """Record the progress of an analysis to resume it after an interruption.
+
+    A checkpoint holds the ids of the commits that were output and the oids the
+    caches claimed while analyzing them. Every `save` appends to both in one
+    transaction, so the file always describes a prefix of the input.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.connection = connect(str(path), timeout=60.0)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS settings ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL"
+            ");"
+            "CREATE TABLE IF NOT EXISTS commits ("
+            "position INTEGER PRIMARY KEY, id TEXT NOT NULL"
+            ");"
+            "CREATE TABLE IF NOT EXISTS oids ("
+            "cache TEXT NOT NULL, oid TEXT NOT NULL, PRIMARY KEY (cache, oid)"
+            ") WITHOUT ROWID;"
+        )
+        self.connection.commit()
+        (self.done,) = self.connection.execute(
+            "SELECT COUNT(*) FROM commits"
+        ).fetchone()
+
+    def settings(self, **settings: object) -> Optional[Dict[str, str]]:
+        """Record the settings of the run, or return the recorded ones if differing."""
+        values = {key: dumps(value, sort_keys=True) for key, value in settings.items()}
+        recorded = dict(self.connection.execute("SELECT key, value FROM settings"))
+        if recorded and recorded != values:
+            return recorded
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO settings VALUES (?, ?)", values.items()
+            )
+        return None
+
+    def commit_ids(self) -> List[str]:
+        return [
+            id
+            for (id,) in self.connection.execute(
+                "SELECT id FROM commits ORDER BY position"
+            )
+        ]
+
+    def caches(self) -> Dict[str, List[str]]:
+        caches: Dict[str, List[str]] = {}
+        for cache, oid in self.connection.execute("SELECT cache, oid FROM oids"):
+            caches.setdefault(cache, []).append(oid)
+        return caches
+
+    def save(
+        self, commit_ids: Sequence[str], caches: Mapping[str, Sequence[str]]
+    ) -> None:
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO commits VALUES (?, ?)",
+                enumerate(commit_ids, self.done),
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO oids VALUES (?, ?)",
+                ((cache, oid) for cache, oids in caches.items() for oid in oids),
+            )
+        self.done += len(commit_ids)
+
+    def close(self) -> None:
+        self.connection.close()
@@ -1,8 +1,9 @@
 from contextlib import contextmanager
+from enum import Enum
 from pathlib import Path
-from typing import TYPE_CHECKING, Iterator, List, Optional
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence
 
-from typer import Argument, Option
+from typer import Abort, Argument, Option, echo
 from typer.models import FileText
 
 from pyrepositoryminer.commands.utils.metric import AvailableMetrics
@@ -10,15 +11,31 @@ from pyrepositoryminer.commands.utils.metric import AvailableMetrics
 if TYPE_CHECKING:
     from multiprocessing.pool import Pool as tcpool
 
+    from pyrepositoryminer.checkpoint import Checkpoint
+    from pyrepositoryminer.metrics.utils import DiffOptions
+
+
+class Engine(str, Enum):
+    commit = "commit"
+    blob = "blob"
+
+
+class OidCacheBackend(str, Enum):
+    unbounded = "unbounded"
+    lru = "lru"
+    bloom = "bloom"
+
 
 class single_worker_Pool:
     def __init__(self) -> None:
         pass
 
     @staticmethod
-    def imap(worker, ids):  # type: ignore
+    def imap(worker, ids, chunksize=1):  # type: ignore # pylint: disable=unused-argument
         yield from map(worker, ids)
 
+    imap_unordered = imap
+
     def __enter__(self):  # type: ignore
         return self
 
@@ -32,12 +49,31 @@ def make_pool(
     repository: Path,
     metrics: List[AvailableMetrics],
     custom_metrics: List[str],
+    store: Optional[Path] = None,
+    fill_cached: bool = False,
+    engine: Engine = Engine.commit,
+    unordered: bool = False,
+    checkpoint: Optional["Checkpoint"] = None,
+    changed_only: bool = False,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    max_blob_size: Optional[int] = None,
+    worktree_dir: Optional[Path] = None,
+    persistent_worktree: bool = False,
+    max_processes: Optional[int] = None,
+    process_timeout: Optional[float] = None,
+    diff_options: Optional["DiffOptions"] = None,
+    oid_cache: OidCacheBackend = OidCacheBackend.unbounded,
+    oid_cache_size: Optional[int] = None,
+    cache_stats: bool = False,
 ) -> Iterator["tcpool"]:
     from multiprocessing import Pool  # pylint: disable=import-outside-toplevel
+    from tempfile import TemporaryDirectory  # pylint: disable=import-outside-toplevel
 
     from pyrepositoryminer.analyze import (  # pylint: disable=import-outside-toplevel
         InitArgs,
         initialize,
+        restore_caches,
     )
     from pyrepositoryminer.commands.utils.metric import (  # pylint: disable=import-outside-toplevel
         import_metric,
@@ -45,31 +81,56 @@ def make_pool(
     from pyrepositoryminer.metrics import (  # pylint: disable=import-outside-toplevel
         all_metrics,
     )
+    from pyrepositoryminer.metrics.cache import (  # pylint: disable=import-outside-toplevel
+        LedgerManager,
+    )
 
-    if workers <= 1:
-        initialize(
-            InitArgs(
-                repository,
-                tuple({metric.value for metric in metrics} & all_metrics.keys()),
-                tuple(map(import_metric, set(custom_metrics))),
-            )
-        )
-        with single_worker_Pool() as pool:
-            yield pool
-        return
+    init_args = InitArgs(
+        repository,
+        tuple({metric.value for metric in metrics} & all_metrics.keys()),
+        tuple(map(import_metric, set(custom_metrics))),
+        store,
+        fill_cached,
+        unordered=unordered and engine is Engine.commit,
+        changed_only=changed_only,
+        include=tuple(include),
+        exclude=tuple(exclude),
+        max_blob_size=max_blob_size,
+        persistent_worktree=persistent_worktree,
+        max_processes=max_processes,
+        process_timeout=process_timeout,
+        oid_cache=oid_cache.value,
+        oid_cache_size=oid_cache_size,
+        cache_stats=cache_stats,
+    )
+    if diff_options is not None:
+        init_args = init_args._replace(diff_options=diff_options)
+    # the worktrees of all workers, removed even if the workers are terminated
+    with TemporaryDirectory(dir=worktree_dir) as base_dir:
+        init_args = init_args._replace(worktree_dir=base_dir)
+        if workers <= 1:
+            initialize(init_args)
+            if checkpoint is not None:
+                restore_caches(checkpoint.done, checkpoint.caches())
+            with single_worker_Pool() as pool:
+                yield pool
+            return
 
-    with Pool(
-        max(workers, 1),
-        initialize,
-        (
-            InitArgs(
-                repository,
-                tuple({metric.value for metric in metrics} & all_metrics.keys()),
-                tuple(map(import_metric, set(custom_metrics))),
-            ),
-        ),
-    ) as pool:
-        yield pool
+        with LedgerManager() as manager:
+            init_args = init_args._replace(
+                ledger=manager.OidLedger(  # type: ignore
+                    oid_cache.value, oid_cache_size
+                )
+            )
+            with Pool(max(workers, 1), initialize, (init_args,)) as pool:
+                if engine is Engine.blob:  # the blob engine plans in the parent
+                    initialize(init_args._replace(ledger=None))
+                elif checkpoint is not None:  # the parent checkpoints the ledger
+                    initialize(init_args)
+                    restore_caches(checkpoint.done, checkpoint.caches())
+                elif cache_stats:  # the parent reads the stats of the ledger
+                    initialize(init_args)
+                yield pool
 
 
 def analyze(
@@ -81,22 +142,231 @@ def analyze(
     ),
     custom_metrics: List[str] = Option([]),
     workers: int = 1,
+    store: Optional[Path] = Option(
+        None,
+        help="The SQLite file to persist metric results in. Results stored by earlier runs are reused instead of recomputed.",  # pylint: disable=line-too-long
+    ),
+    fill_cached: bool = Option(
+        False,
+        help="Output the stored values of cached metrics instead of null. Requires --store.",  # pylint: disable=line-too-long
+    ),
+    engine: Engine = Option(
+        Engine.commit,
+        case_sensitive=False,
+        help="Distribute commits, or the unique blobs of all commits, to the workers.",  # pylint: disable=line-too-long
+    ),
+    batch_size: Optional[int] = Option(
+        None,
+        min=1,
+        help="The number of commits sent to a worker at once. Grows from 1 if this is not passed.",  # pylint: disable=line-too-long
+    ),
+    unordered: bool = Option(
+        False,
+        help="Output commits as soon as they are analyzed, tagged with their input index. Only applies to the commit engine.",  # pylint: disable=line-too-long
+    ),
+    max_in_flight: Optional[int] = Option(
+        None,
+        min=1,
+        help="The maximum number of commits sent to the workers but not yet output. Unbounded if this is not passed.",  # pylint: disable=line-too-long
+    ),
+    checkpoint: Optional[Path] = Option(
+        None,
+        help="The file to record the progress in. A run with an existing checkpoint skips the commits it recorded and continues their cached objects. Requires ordered output of the commit engine and an unbounded oid cache.",  # pylint: disable=line-too-long
+    ),
+    checkpoint_interval: int = Option(
+        1000,
+        min=1,
+        help="The number of commits between two checkpoints.",
+    ),
+    changed_only: bool = Option(
+        False,
+        help="Only output the native blob metrics of blobs not seen in the commits before.",  # pylint: disable=line-too-long
+    ),
+    include: List[str] = Option(
+        [],
+        help="Only analyze the files matching this glob. Globs without a slash match names at any depth.",  # pylint: disable=line-too-long
+    ),
+    exclude: List[str] = Option(
+        [],
+        help="Do not analyze the files and directories matching this glob. Globs without a slash match names at any depth.",  # pylint: disable=line-too-long
+    ),
+    max_blob_size: Optional[int] = Option(
+        None,
+        min=0,
+        help="Do not analyze the files larger than this many bytes. The size is read without reading the contents.",  # pylint: disable=line-too-long
+    ),
+    worktree_dir: Optional[Path] = Option(
+        None,
+        help="The directory to check out commits in for the dir metrics, e.g. on a tmpfs. The temporary directory of the system if this is not passed.",  # pylint: disable=line-too-long
+    ),
+    persistent_worktree: bool = Option(
+        False,
+        help="Keep one worktree per worker and move it from commit to commit by writing only the changed files.",  # pylint: disable=line-too-long
+    ),
+    max_processes: Optional[int] = Option(
+        None,
+        min=1,
+        help="The maximum number of external tool processes a worker runs at once. The number of CPUs if this is not passed.",  # pylint: disable=line-too-long
+    ),
+    process_timeout: Optional[float] = Option(
+        None,
+        help="The seconds an external tool may run for a metric before it is killed and the metric is left out. Unlimited if this is not passed.",  # pylint: disable=line-too-long
+    ),
+    first_parent: bool = Option(
+        False,
+        help="Diff merge commits only to their first parent for the diff metrics.",  # pylint: disable=line-too-long
+    ),
+    find_renames: bool = Option(
+        False,
+        help="Detect renamed files in the diffs for the diff metrics.",
+    ),
+    find_copies: bool = Option(
+        False,
+        help="Detect copied files in the diffs for the diff metrics.",
+    ),
+    rename_threshold: int = Option(
+        50,
+        min=0,
+        max=100,
+        help="The percentage of similarity at which a deleted and an added file are a rename.",  # pylint: disable=line-too-long
+    ),
+    copy_threshold: int = Option(
+        50,
+        min=0,
+        max=100,
+        help="The percentage of similarity at which an added file is a copy.",
+    ),
+    oid_cache: OidCacheBackend = Option(
+        OidCacheBackend.unbounded,
+        case_sensitive=False,
+        help="How the caches of seen objects hold their oids. lru holds the oids used last and analyzes an evicted object again, bloom holds bits and outputs a few unseen objects as cached. Only unbounded caches can be checkpointed.",  # pylint: disable=line-too-long
+    ),
+    oid_cache_size: int = Option(
+        1000000,
+        min=1,
+        help="The number of oids an lru cache holds, or a bloom cache is sized for at an error rate of 1e-4. With either, it also bounds the memos of computed values.",  # pylint: disable=line-too-long
+    ),
+    cache_stats: bool = Option(
+        False,
+        help="Print the hits, misses and memory use of the oid caches and memos to stderr. Only applies to the commit engine.",  # pylint: disable=line-too-long
+    ),
 ) -> None:
     """Analyze commits of a repository.
 
     Either provide the commit ids to analyze on stdin or as a file argument."""
-    from sys import stdin  # pylint: disable=import-outside-toplevel
+    from sys import stdin, stdout  # pylint: disable=import-outside-toplevel
 
     from pyrepositoryminer.analyze import (  # pylint: disable=import-outside-toplevel
-        worker,
+        run_blob_engine,
+        run_commit_engine,
+        snapshot_caches,
+        stat_caches,
+    )
+    from pyrepositoryminer.checkpoint import (  # pylint: disable=import-outside-toplevel
+        Checkpoint,
+    )
+    from pyrepositoryminer.metrics.utils import (  # pylint: disable=import-outside-toplevel
+        DiffOptions,
     )
 
     metrics = metrics if metrics else []
+    diff_options = DiffOptions(
+        first_parent, find_renames, find_copies, rename_threshold, copy_threshold
+    )
     ids = (
         id.strip()
         for id in (commits if commits else stdin)  # pylint: disable=superfluous-parens
     )
-    with make_pool(workers, repository, metrics, custom_metrics) as pool:
-        results = (res for res in pool.imap(worker, ids) if res is not None)
+    state = None
+    start = 0
+    if fill_cached and store is None:
+        echo("Filling cached metrics requires a store")
+        raise Abort()
+    if cache_stats and engine is Engine.blob:
+        echo("Cache statistics require the commit engine")
+        raise Abort()
+    if checkpoint is not None:
+        if engine is Engine.blob or unordered:
+            echo("A checkpoint requires ordered output of the commit engine")
+            raise Abort()
+        if oid_cache is not OidCacheBackend.unbounded:
+            # a restored cache neither holds the evictions nor the order of an lru
+            echo("A checkpoint requires an unbounded oid cache")
+            raise Abort()
+        state = Checkpoint(checkpoint)
+        if state.settings(
+            metrics=sorted(metric.value for metric in metrics),
+            custom_metrics=sorted(set(custom_metrics)),
+            include=sorted(set(include)),
+            exclude=sorted(set(exclude)),
+            max_blob_size=max_blob_size,
+            diff_options=str(diff_options),
+        ):
+            echo(f'Checkpoint "{checkpoint}" was recorded with different settings')
+            raise Abort()
+        recorded = set(state.commit_ids())
+        ids = tuple(id for id in ids if id not in recorded)  # type: ignore
+        start = state.done
+
+    def save(done: int, interval: int = checkpoint_interval) -> None:
+        if state is None or done - state.done < interval:
+            return
+        stdout.flush()  # the checkpoint must not be ahead of the output
+        state.save(
+            ids[state.done - start : done - start],  # type: ignore
+            snapshot_caches(state.done, done),
+        )
+
+    with make_pool(
+        workers,
+        repository,
+        metrics,
+        custom_metrics,
+        store,
+        fill_cached,
+        engine,
+        unordered,
+        state,
+        changed_only,
+        include,
+        exclude,
+        max_blob_size,
+        worktree_dir,
+        persistent_worktree,
+        max_processes,
+        process_timeout,
+        diff_options,
+        oid_cache,
+        oid_cache_size,
+        cache_stats,
+    ) as pool:
+        if engine is Engine.blob:
+            results = run_blob_engine(
+                pool, tuple(ids), workers, batch_size, max_in_flight
+            )
+        elif state is None:
+            results = run_commit_engine(
+                pool, ids, workers, batch_size, max_in_flight, unordered
+            )
+        else:
+            results = run_commit_engine(
+                pool,
+                ids,
+                workers,
+                batch_size,
+                max_in_flight,
+                start=start,
+                progress=save,
+            )
         for result in results:
             print(result)
+        if cache_stats:
+            for name, stats in sorted(stat_caches().items()):
+                echo(
+                    f"{name}: {stats.hits} hits, {stats.misses} misses, "
+                    f"{stats.oids} oids, {stats.nbytes} bytes",
+                    err=True,
+                )
+        if state is not None:
+            save(start + len(ids), 1)  # type: ignore
+            state.close()
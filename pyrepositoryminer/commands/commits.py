@@ -52,31 +52,45 @@ def commits(
     sort: Sort = Option(Sort.topological, case_sensitive=False),
     sort_reverse: bool = True,
     limit: Optional[int] = None,
+    state: Optional[Path] = Option(
+        None,
+        help="The JSON file of the branch tips of the last run. Commits reachable from them are skipped, and the new tips are recorded.",  # pylint: disable=line-too-long
+    ),
 ) -> None:
     """Get the commit ids of a repository.
 
     Either provide the branches to get the commit ids from on stdin or as a file argument."""  # pylint: disable=line-too-long
-    from typer import echo  # pylint: disable=import-outside-toplevel
+    from typer import Abort, echo  # pylint: disable=import-outside-toplevel
 
     from pyrepositoryminer.commands.utils.commits import (  # pylint: disable=import-outside-toplevel
         generate_walkers,
         iter_distinct,
+        read_tips,
+        write_tips,
     )
 
+    if state is not None and limit is not None:
+        echo("The tips of a limited run cannot be recorded", err=True)
+        raise Abort()
+
     branch_names: Iterable[str]
     if branches != Path("-"):
         with open(branches, encoding="utf-8") as f:
             branch_names = list(f)
     else:
         branch_names = (line for line in stdin)
-    branch_names = (branch.strip() for branch in branch_names)
+    branch_names = [branch.strip() for branch in branch_names]
+    repo = Repository(repository)
+    tips = {} if state is None else read_tips(state)
+    heads = {name: str(repo.branches[name].peel().id) for name in branch_names}
     commit_ids: Iterable[str] = (
         str(commit.id)
         for walker in generate_walkers(
-            Repository(repository),
+            repo,
             branch_names,
             simplify_first_parent,
             sort.flag if not sort_reverse else (sort.flag | GIT_SORT_REVERSE),
+            tips.values(),
         )
         for commit in walker
     )
@@ -84,3 +98,5 @@ def commits(
     commit_ids = commit_ids if limit is None else islice(commit_ids, limit)
     for commit_id in commit_ids:
         echo(commit_id)
+    if state is not None:  # only once all new commits were listed
+        write_tips(state, {**tips, **heads})
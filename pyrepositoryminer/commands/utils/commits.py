@@ -1,5 +1,8 @@
 from itertools import filterfalse
-from typing import Hashable, Iterable, Set, TypeVar
+from json import dump, load
+from os import replace
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, Set, TypeVar
 
 from pygit2 import Repository, Walker
 
@@ -18,6 +21,7 @@ def generate_walkers(
     branch_names: Iterable[str],
     simplify_first_parent: bool,
     sorting: int,
+    hidden: Iterable[str] = (),
 ) -> Iterable[Walker]:
     walkers = tuple(
         repo.walk(repo.branches[branch_name].peel().id, sorting)
@@ -25,4 +29,22 @@ def generate_walkers(
     )
     for walker in walkers if simplify_first_parent else tuple():
         walker.simplify_first_parent()
+    hidden = tuple(oid for oid in hidden if repo.get(oid) is not None)
+    for walker in walkers:
+        for oid in hidden:
+            walker.hide(oid)
     yield from walkers
+
+
+def read_tips(path: Path) -> Dict[str, str]:
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return dict(load(f)["tips"])
+
+
+def write_tips(path: Path, tips: Dict[str, str]) -> None:
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        dump({"tips": tips}, f, indent=2, sort_keys=True)
+    replace(tmp, path)
@@ -0,0 +1,430 @@
+# Caches of the oids seen before, locally or shared between workers by the
+# OidLedger. lru re-analyzes evicted oids, bloom has false positives and can't
+# be checkpointed. Memos hold as many values as a bounded cache, or MEMO_SIZE.
+from collections import OrderedDict
+from hashlib import blake2b
+from math import ceil, log
+from multiprocessing.managers import BaseManager
+from sys import getsizeof
+from threading import Condition
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+Key = Union[bytes, Tuple[bytes, str]]
+K = TypeVar("K")
+V = TypeVar("V")
+T = TypeVar("T")
+
+RESTORED = -1  # the index of oids restored from a checkpoint
+MEMO_SIZE = 1 << 16  # the values a memo holds if the caches are unbounded
+UNBOUNDED, LRU, BLOOM = "unbounded", "lru", "bloom"
+
+
+def encode_key(key: Key) -> str:
+    if isinstance(key, bytes):
+        return key.hex()
+    return f"{key[0].hex()}:{key[1]}"
+
+
+def decode_key(key: str) -> Key:
+    oid, sep, path = key.partition(":")
+    return (bytes.fromhex(oid), path) if sep else bytes.fromhex(oid)
+
+
+def _key_size(key: Key) -> int:
+    if isinstance(key, bytes):
+        return getsizeof(key)
+    return getsizeof(key) + getsizeof(key[0]) + getsizeof(key[1])
+
+
+class LruOids:
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.oids: "OrderedDict[Key, int]" = OrderedDict()
+
+    def __contains__(self, key: Key) -> bool:
+        if key not in self.oids:
+            return False
+        self.oids.move_to_end(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self.oids)
+
+    def setdefault(self, key: Key, index: int) -> int:
+        if key in self:
+            return self.oids[key]
+        self.oids[key] = index
+        if len(self.oids) > self.size:
+            self.oids.popitem(last=False)
+        return index
+
+    def items(self) -> Iterable[Tuple[Key, int]]:
+        return self.oids.items()
+
+
+class BloomOids:
+    # the bit positions are taken from the raw oid, its bytes are random already
+
+    error_rate = 1e-4
+
+    def __init__(self, size: int) -> None:
+        bits = max(ceil(-size * log(self.error_rate) / log(2) ** 2), 64)
+        self.bits = bytearray(ceil(bits / 8))
+        self.hashes = max(round(len(self.bits) * 8 / size * log(2)), 1)
+        self.added = 0
+
+    def positions(self, key: Key) -> Iterator[int]:
+        if isinstance(key, bytes):
+            digest = key
+        else:
+            digest = blake2b(key[0] + key[1].encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        n = len(self.bits) * 8
+        return ((h1 + i * h2) % n for i in range(self.hashes))
+
+    def __contains__(self, key: Key) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & 1 << (p & 7) for p in self.positions(key))
+
+    def __len__(self) -> int:
+        return self.added
+
+    def setdefault(self, key: Key, index: int) -> int:
+        if key not in self:
+            for p in self.positions(key):
+                self.bits[p >> 3] |= 1 << (p & 7)
+            self.added += 1
+        return index
+
+    def items(self) -> Iterable[Tuple[Key, int]]:
+        raise TypeError("The oids of a bloom cache cannot be listed")
+
+
+Oids = Union[Dict[Key, int], LruOids, BloomOids]
+
+
+def new_oids(backend: str = UNBOUNDED, size: Optional[int] = None) -> Oids:
+    if backend == LRU and size is not None:
+        return LruOids(size)
+    if backend == BLOOM and size is not None:
+        return BloomOids(size)
+    return {}
+
+
+def _nbytes(oids: Oids) -> int:
+    # the approximate memory use of the oids
+    if isinstance(oids, BloomOids):
+        return getsizeof(oids.bits)
+    table = oids.oids if isinstance(oids, LruOids) else oids
+    return getsizeof(table) + sum(map(_key_size, table))
+
+
+def _snapshot(oids: Oids, start: int, stop: int) -> List[str]:
+    return [encode_key(oid) for oid, index in oids.items() if start <= index < stop]
+
+
+class CacheStats(NamedTuple):
+    hits: int = 0
+    misses: int = 0
+    oids: int = 0
+    nbytes: int = 0
+
+
+class Memo(Generic[K, V]):
+    # an evicted value is computed again
+
+    size = MEMO_SIZE
+
+    def __init__(self) -> None:
+        self.values: "OrderedDict[K, V]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        value = self.values.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.values.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self.values[key] = value
+        if len(self.values) > self.size:
+            self.values.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def stats(self) -> CacheStats:
+        # the values are measured shallowly, the keys like those of a cache
+        nbytes = getsizeof(self.values) + sum(
+            (_key_size(key) if isinstance(key, (bytes, tuple)) else getsizeof(key))
+            + getsizeof(value)
+            for key, value in self.values.items()
+        )
+        return CacheStats(self.hits, self.misses, len(self.values), nbytes)
+
+
+class OidCache:
+    # the index of the commit the worker currently analyzes
+    index: int = 0
+    # the backend of the caches of the worker, a cache creates it on first use
+    backend: str = UNBOUNDED
+    size: Optional[int] = None
+
+    def __init__(self) -> None:
+        self._oids: Optional[Oids] = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def oids(self) -> Oids:
+        if self._oids is None:
+            self._oids = new_oids(self.backend, self.size)
+        return self._oids
+
+    def count(self, flags: List[bool]) -> List[bool]:
+        hits = sum(flags)
+        self.hits += hits
+        self.misses += len(flags) - hits
+        return flags
+
+    def claim(self, oids: Iterable[Key], release: bool = True) -> List[bool]:
+        # an oid is cached if it was claimed before, also earlier in oids
+        # pylint: disable=unused-argument
+        cache = self.oids
+        flags = []
+        for oid in oids:
+            flags.append(oid in cache)
+            cache.setdefault(oid, self.index)
+        return self.count(flags)
+
+    def settle(
+        self, add: Iterable[Key], query: Iterable[Key], release: bool = True
+    ) -> List[bool]:
+        # pylint: disable=unused-argument
+        cache = self.oids
+        for oid in add:
+            cache.setdefault(oid, self.index)
+        return self.count([oid in cache for oid in query])
+
+    def release(self) -> None:
+        pass
+
+    def snapshot(self, start: int, stop: int) -> List[str]:
+        return _snapshot(self.oids, start, stop)
+
+    def restore(self, oids: Iterable[str]) -> None:
+        cache = self.oids
+        for oid in map(decode_key, oids):
+            cache.setdefault(oid, RESTORED)
+
+    def stats(self) -> CacheStats:
+        return CacheStats(self.hits, self.misses, len(self.oids), _nbytes(self.oids))
+
+
+def configure(backend: str = UNBOUNDED, size: Optional[int] = None) -> None:
+    OidCache.backend = backend
+    OidCache.size = size
+    Memo.size = MEMO_SIZE if backend == UNBOUNDED or size is None else size
+
+
+def claim_levels(
+    cache: OidCache,
+    level: Iterable[Tuple[T, str]],
+    key: Callable[[T, str], Key],
+    below: Callable[[T, str, bool], Iterable[Tuple[T, str]]],
+) -> Iterator[Tuple[T, str, bool]]:
+    # claim level by level like a breadth-first walk, the objects below an
+    # object are claimed with the next level, the last level releases the turn
+    level = list(level)
+    while level:
+        flags = cache.claim([key(obj, path) for obj, path in level], release=False)
+        next_level: List[Tuple[T, str]] = []
+        for (obj, path), is_cached in zip(level, flags):
+            yield obj, path, is_cached
+            next_level.extend(below(obj, path, is_cached))
+        level = next_level
+    cache.release()
+
+
+class _Namespace(OidCache):
+    def __init__(self, index: int, skipped: Iterable[int], oids: Oids) -> None:
+        super().__init__()
+        self.index = index  # the index of the commit whose turn it is
+        self.skipped: Set[int] = set(skipped)
+        self._oids = oids
+
+
+class OidLedger:
+    # serve the caches of all workers in the input order of the commits
+
+    def __init__(self, backend: str = UNBOUNDED, size: Optional[int] = None) -> None:
+        self.backend = backend
+        self.size = size
+        self.condition = Condition()
+        self.namespaces: Dict[str, _Namespace] = {}
+        self.finished: Set[int] = set()
+        self.finished_below = 0
+        self.memos: Dict[int, Dict[str, CacheStats]] = {}  # by worker
+
+    def _turn(self, name: str, index: int) -> _Namespace:
+        namespace = self.namespaces.get(name)
+        if namespace is None:  # commits finished up to now never used it
+            namespace = _Namespace(
+                self.finished_below,
+                self.finished,
+                new_oids(self.backend, self.size),
+            )
+            self.namespaces[name] = namespace
+        self.condition.wait_for(lambda: namespace.index == index)
+        return namespace
+
+    def _release(self, namespace: _Namespace) -> None:
+        namespace.index += 1
+        while namespace.index in namespace.skipped:
+            namespace.skipped.remove(namespace.index)
+            namespace.index += 1
+        self.condition.notify_all()
+
+    def claim(
+        self, name: str, index: int, oids: Sequence[Key], release: bool = True
+    ) -> List[bool]:
+        with self.condition:
+            namespace = self._turn(name, index)
+            flags = namespace.claim(oids)
+            if release:
+                self._release(namespace)
+        return flags
+
+    def settle(
+        self,
+        name: str,
+        index: int,
+        add: Sequence[Key],
+        query: Sequence[Key],
+        release: bool = True,
+    ) -> List[bool]:
+        with self.condition:
+            namespace = self._turn(name, index)
+            flags = namespace.settle(add, query)
+            if release:
+                self._release(namespace)
+        return flags
+
+    def release(self, name: str, index: int) -> None:
+        with self.condition:
+            self._release(self._turn(name, index))
+
+    def finish(self, index: int) -> None:
+        with self.condition:
+            for namespace in self.namespaces.values():
+                if namespace.index == index:
+                    self._release(namespace)
+                elif namespace.index < index:
+                    namespace.skipped.add(index)
+            self.finished.add(index)
+            while self.finished_below in self.finished:
+                self.finished.remove(self.finished_below)
+                self.finished_below += 1
+            self.condition.notify_all()
+
+    def snapshot(self, start: int, stop: int) -> Dict[str, List[str]]:
+        with self.condition:
+            return {
+                name: namespace.snapshot(start, stop)
+                for name, namespace in self.namespaces.items()
+            }
+
+    def report(self, worker: int, memos: Mapping[str, CacheStats]) -> None:
+        # the memos are held by the workers, each reports the stats of its own
+        with self.condition:
+            self.memos[worker] = dict(memos)
+
+    def stats(self) -> Dict[str, CacheStats]:
+        with self.condition:
+            stats = {
+                name: namespace.stats() for name, namespace in self.namespaces.items()
+            }
+            for memos in self.memos.values():
+                for name, memo in memos.items():
+                    total = zip(stats.get(name, CacheStats()), memo)
+                    stats[name] = CacheStats(*map(sum, total))
+            return stats
+
+    def restore(self, index: int, caches: Mapping[str, Iterable[str]]) -> None:
+        # continue with commit index, before any worker claimed an oid
+        with self.condition:
+            self.finished_below = index
+            for name, oids in caches.items():
+                namespace = _Namespace(index, (), new_oids(self.backend, self.size))
+                namespace.restore(oids)
+                self.namespaces[name] = namespace
+
+
+class SharedOidCache(OidCache):
+    def __init__(self, ledger: Any, name: str) -> None:
+        super().__init__()
+        self.ledger = ledger
+        self.name = name
+
+    def claim(self, oids: Iterable[Key], release: bool = True) -> List[bool]:
+        return list(self.ledger.claim(self.name, self.index, list(oids), release))
+
+    def settle(
+        self, add: Iterable[Key], query: Iterable[Key], release: bool = True
+    ) -> List[bool]:
+        return list(
+            self.ledger.settle(self.name, self.index, list(add), list(query), release)
+        )
+
+    def release(self) -> None:
+        self.ledger.release(self.name, self.index)
+
+
+def find_caches(obj: Any, prefix: str) -> Iterator[Tuple[str, str, OidCache]]:
+    for attr, value in list(vars(obj).items()):
+        if type(value) is OidCache:  # pylint: disable=unidiomatic-typecheck
+            yield attr, f"{prefix}:{attr}", value
+
+
+def find_memos(obj: Any, prefix: str) -> Iterator[Tuple[str, Memo[Any, Any]]]:
+    # the memos of an object, and of the objects it holds, like aggregates
+    for attr, value in list(vars(obj).items()):
+        if isinstance(value, Memo):
+            yield f"{prefix}:{attr}", value
+        elif hasattr(value, "__dict__"):
+            for sub, memo in list(vars(value).items()):
+                if isinstance(memo, Memo):
+                    yield f"{prefix}:{attr}.{sub}", memo
+
+
+def share_caches(obj: Any, ledger: Any, prefix: str) -> None:
+    for attr, name, _ in find_caches(obj, prefix):
+        setattr(obj, attr, SharedOidCache(ledger, name))
+
+
+class LedgerManager(BaseManager):
+    pass
+
+
+LedgerManager.register("OidLedger", OidLedger)
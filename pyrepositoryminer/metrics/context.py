@@ -0,0 +1,92 @@
+from typing import Dict, FrozenSet, List, Optional
+
+from pygit2 import Diff, Oid
+from pygit2._pygit2 import DiffDelta, DiffFile
+
+from pyrepositoryminer.metrics.cache import Key
+from pyrepositoryminer.metrics.paths import PathFilter, SizeFilter, join
+from pyrepositoryminer.metrics.utils import DiffOptions, get_diffs, get_touchedfiles
+from pyrepositoryminer.pobjects import Blob, Commit, Object, Tree
+
+
+class CommitContext:
+    """Share the traversal of a commit between the visitors and metrics.
+
+    Every tree of the commit is listed at most once, and the commit is diffed
+    to its parents at most once, however many visitors and metrics use them.
+    Paths not selected by the path filter and blobs not selected by the size
+    filter are left out of both.
+    """
+
+    def __init__(
+        self,
+        commit: Commit,
+        paths: Optional[PathFilter] = None,
+        sizes: Optional[SizeFilter] = None,
+        diff_options: DiffOptions = DiffOptions(),
+    ) -> None:
+        self.commit = commit
+        self.paths = paths
+        self.sizes = sizes
+        self.diff_options = diff_options
+        self.trees: Dict[Key, List[Object]] = {}
+        self._diffs: Optional[List[Diff]] = None
+        self._touchedfiles: Optional[FrozenSet[DiffFile]] = None
+
+    def tree_key(self, tree: Tree, path: str) -> Key:
+        # the entries of a tree depend on its path if paths are filtered
+        return tree.oid if self.paths is None else (tree.oid, path)
+
+    @property
+    def is_filtered(self) -> bool:
+        return self.paths is not None or self.sizes is not None
+
+    def entries(self, tree: Tree, path: str = "") -> List[Object]:
+        key = self.tree_key(tree, path)
+        entries = self.trees.get(key)
+        if entries is None:
+            entries = list(tree)
+            if self.paths is not None:
+                entries = [
+                    obj
+                    for obj in entries
+                    if self.paths.selects(join(path, obj.name), isinstance(obj, Tree))
+                ]
+            if self.sizes is not None:
+                entries = [
+                    obj
+                    for obj in entries
+                    if not isinstance(obj, Blob) or self.sizes.selects(obj.obj.id)
+                ]
+            self.trees[key] = entries
+        return entries
+
+    def selects_file(self, path: str) -> bool:
+        return self.paths is None or self.paths.selects_file(path)
+
+    def selects_blob(self, oid: Oid) -> bool:
+        # the zero oid stands for the missing side of an added or deleted file
+        return self.sizes is None or not oid or self.sizes.selects(oid)
+
+    def selects_delta(self, delta: DiffDelta) -> bool:
+        return (
+            self.selects_file(delta.new_file.path)
+            and self.selects_blob(delta.old_file.id)
+            and self.selects_blob(delta.new_file.id)
+        )
+
+    @property
+    def diffs(self) -> List[Diff]:
+        if self._diffs is None:
+            self._diffs = get_diffs(self.commit, self.diff_options)
+        return self._diffs
+
+    @property
+    def touchedfiles(self) -> FrozenSet[DiffFile]:
+        if self._touchedfiles is None:
+            self._touchedfiles = frozenset(
+                file
+                for file in get_touchedfiles(self.commit, self.diffs)
+                if self.selects_file(file.path) and self.selects_blob(file.id)
+            )
+        return self._touchedfiles
@@ -5,3 +5,5 @@ from pyrepositoryminer.metrics.nativeblob.pylinecount import Pylinecount
 class Diffpylinecount(DiffBlobMetric):
     filter = Pylinecount.filter
     analyze = Pylinecount.analyze
+    analyze_batch = Pylinecount.analyze_batch
+    batch_size = Pylinecount.batch_size
@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Iterable
+from typing import Iterable, Optional
 
 from pygit2 import Repository
 
+from pyrepositoryminer.metrics.context import CommitContext
 from pyrepositoryminer.metrics.main import BaseMetric, BaseVisitor
+from pyrepositoryminer.metrics.nativeblob.main import NativeBlobMetric
 from pyrepositoryminer.metrics.structs import NativeBlobMetricInput
-from pyrepositoryminer.metrics.utils import get_touchedfiles
 from pyrepositoryminer.pobjects import Blob, Commit, Object
 
 
@@ -14,17 +15,25 @@ class DiffBlobVisitor(BaseVisitor):
         super().__init__()
         self.repository = repository
 
-    def __call__(self, visitable_object: Object) -> Iterable[NativeBlobMetricInput]:
+    def __call__(
+        self, visitable_object: Object, context: Optional[CommitContext] = None
+    ) -> Iterable[NativeBlobMetricInput]:
         if isinstance(visitable_object, Commit):
-            for file in get_touchedfiles(visitable_object):
-                blob = Blob(self.repository.get(file.id))
-                yield NativeBlobMetricInput(
-                    self.oid_is_cached(blob.id), str(file.path), blob
-                )
-                self.cache_oid(blob.id)
+            if context is None:
+                context = CommitContext(visitable_object)
+            files = [
+                (str(file.path), Blob(self.repository.get(file.id)))
+                for file in context.touchedfiles
+            ]
+            flags = self.oid_cache.claim(blob.oid for _, blob in files)
+            for (path, blob), is_cached in zip(files, flags):
+                yield NativeBlobMetricInput(is_cached, path, blob)
 
 
 class DiffBlobMetric(BaseMetric[NativeBlobMetricInput], ABC):
+    cache_key = NativeBlobMetric.cache_key
+    restore = NativeBlobMetric.restore
+
     @staticmethod
     @abstractmethod
     def filter(tup: NativeBlobMetricInput) -> bool:
@@ -2,11 +2,11 @@ from abc import ABC
 from tempfile import TemporaryDirectory
 from typing import Optional
 
-from pygit2 import GIT_CHECKOUT_FORCE, Repository
+from pygit2 import GIT_CHECKOUT_DISABLE_PATHSPEC_MATCH, GIT_CHECKOUT_FORCE, Repository
 
+from pyrepositoryminer.metrics.context import CommitContext
 from pyrepositoryminer.metrics.main import BaseMetric, BaseVisitor
 from pyrepositoryminer.metrics.structs import DirMetricInput
-from pyrepositoryminer.metrics.utils import get_touchedfiles
 from pyrepositoryminer.pobjects import Commit, Object
 
 
@@ -17,20 +17,25 @@ class DiffDirVisitor(BaseVisitor):
         self.base_dir = base_dir
         self.tempdir: Optional[TemporaryDirectory[str]] = None
 
-    def __call__(self, visitable_object: Object) -> Optional[DirMetricInput]:
+    def __call__(
+        self, visitable_object: Object, context: Optional[CommitContext] = None
+    ) -> Optional[DirMetricInput]:
         if not isinstance(visitable_object, Commit):
             return None
+        if context is None:
+            context = CommitContext(visitable_object)
         self.tempdir = TemporaryDirectory(  # pylint: disable=consider-using-with
             dir=self.base_dir
         )
-        self.repository.checkout_tree(
-            visitable_object.tree.obj,
-            directory=self.tempdir.name,
-            paths=[file.path for file in get_touchedfiles(visitable_object)],
-            strategy=GIT_CHECKOUT_FORCE,
-        )
-        is_cached = self.oid_is_cached(visitable_object.tree.id)
-        self.cache_oid(visitable_object.tree.id)
+        paths = [file.path for file in context.touchedfiles]
+        if paths:  # no paths would check out the whole tree
+            self.repository.checkout_tree(
+                visitable_object.tree.obj,
+                directory=self.tempdir.name,
+                paths=paths,
+                strategy=GIT_CHECKOUT_FORCE | GIT_CHECKOUT_DISABLE_PATHSPEC_MATCH,
+            )
+        (is_cached,) = self.oid_cache.claim((visitable_object.tree.oid,))
         return DirMetricInput(is_cached, self.tempdir.name, visitable_object.tree)
 
     def close(self) -> None:
@@ -1,39 +1,193 @@
 from abc import ABC
+from os import fsdecode
+from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
 
-from pygit2 import GIT_CHECKOUT_FORCE, Repository
+from pygit2 import (
+    GIT_CHECKOUT_FORCE,
+    GIT_FILEMODE_BLOB_EXECUTABLE,
+    GIT_FILEMODE_COMMIT,
+    GIT_FILEMODE_LINK,
+    Index,
+    IndexEntry,
+    Oid,
+    Repository,
+)
 
+from pyrepositoryminer.metrics.context import CommitContext
 from pyrepositoryminer.metrics.main import BaseMetric, BaseVisitor
+from pyrepositoryminer.metrics.paths import join
 from pyrepositoryminer.metrics.structs import DirMetricInput
-from pyrepositoryminer.pobjects import Commit, Object
+from pyrepositoryminer.pobjects import Commit, Object, Tree
+
+if TYPE_CHECKING:
+    from pygit2.enums import FileMode
+
+File = Tuple[Oid, "FileMode"]  # the oid and the file mode of a checked out file
+
+
+def get_files(tree: Tree, context: CommitContext) -> Dict[str, File]:
+    # the selected files, to check out only these
+    files: Dict[str, File] = {}
+    q = [(tree, "")]
+    while q:
+        tree, path = q.pop()
+        for obj in context.entries(tree, path):
+            if isinstance(obj, Tree):
+                q.append((obj, join(path, obj.name)))
+            else:
+                files[join(path, obj.name)] = (obj.obj.id, obj.obj.filemode)
+    return files
+
+
+def get_index(files: Dict[str, File]) -> Index:
+    index = Index()
+    for path, (oid, mode) in files.items():
+        index.add(IndexEntry(path, oid, mode))
+    return index
 
 
 class DirVisitor(BaseVisitor):
-    def __init__(self, repository: Repository, base_dir: Optional[str] = None) -> None:
+    """Check out the commits for the dir metrics.
+
+    Every commit is checked out to a new directory, unless the worktree is
+    persistent. A persistent worktree is checked out fully once and then
+    moved from commit to commit by removing and writing only the files that
+    differ, so the cost follows the size of the change.
+    """
+
+    def __init__(
+        self,
+        repository: Repository,
+        base_dir: Optional[str] = None,
+        persistent: bool = False,
+    ) -> None:
         super().__init__()
         self.repository = repository
         self.base_dir = base_dir
+        self.persistent = persistent
         self.tempdir: Optional[TemporaryDirectory[str]] = None
+        # the checked out tree, or the checked out files if paths are filtered
+        self.tree: Optional[Tree] = None
+        self.files: Optional[Dict[str, File]] = None
 
-    def __call__(self, visitable_object: Object) -> Optional[DirMetricInput]:
+    def checkout(self, tree: Tree, context: Optional[CommitContext]) -> None:
+        assert self.tempdir is not None
+        if context is None or not context.is_filtered:
+            self.repository.checkout_tree(
+                tree.obj, directory=self.tempdir.name, strategy=GIT_CHECKOUT_FORCE
+            )
+            self.tree = tree
+        else:
+            self.files = get_files(tree, context)
+            self.repository.checkout_index(
+                get_index(self.files),
+                directory=self.tempdir.name,
+                strategy=GIT_CHECKOUT_FORCE,
+            )
+
+    def changes(
+        self, tree: Tree, context: Optional[CommitContext]
+    ) -> Tuple[Iterable[str], Iterable[Tuple[str, File]]]:
+        # the paths to remove and the files to write, writing replaces a file
+        if self.tree is not None:
+            deltas = list(self.tree.obj.diff_to_tree(tree.obj).deltas)
+            self.tree = tree
+            return (
+                [d.old_file.path for d in deltas if d.status_char() in "DT"],
+                [
+                    (d.new_file.path, (d.new_file.id, d.new_file.mode))
+                    for d in deltas
+                    if d.status_char() in "AMT"
+                ],
+            )
+        assert self.files is not None and context is not None
+        old, self.files = self.files, get_files(tree, context)
+        return (
+            [
+                path
+                for path, (_, mode) in old.items()
+                if path not in self.files or self.files[path][1] != mode
+            ],
+            [
+                (path, file)
+                for path, file in self.files.items()
+                if old.get(path) != file
+            ],
+        )
+
+    def remove(self, path: str) -> None:
+        assert self.tempdir is not None
+        target = Path(self.tempdir.name, path)
+        if target.is_dir() and not target.is_symlink():  # a submodule
+            target.rmdir()
+        elif target.is_symlink() or target.exists():
+            target.unlink()
+        # a directory only exists with files in it
+        parent = Path(path).parent
+        while parent.name:
+            try:
+                Path(self.tempdir.name, parent).rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+
+    def write(self, path: str, file: File) -> None:
+        assert self.tempdir is not None
+        target = Path(self.tempdir.name, path)
+        oid, mode = file
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.is_symlink() or target.exists():
+            target.unlink()
+        if mode == GIT_FILEMODE_COMMIT:
+            target.mkdir()
+        elif mode == GIT_FILEMODE_LINK:
+            target.symlink_to(fsdecode(self.repository[oid].data))
+        else:
+            target.touch(0o777 if mode == GIT_FILEMODE_BLOB_EXECUTABLE else 0o666)
+            target.write_bytes(memoryview(self.repository[oid]))
+
+    def move(self, tree: Tree, context: Optional[CommitContext]) -> None:
+        if self.tree is None and self.files is None:
+            self.checkout(tree, context)
+            return
+        removed, written = self.changes(tree, context)
+        for path in removed:
+            self.remove(path)
+        for path, file in written:
+            self.write(path, file)
+
+    def __call__(
+        self, visitable_object: Object, context: Optional[CommitContext] = None
+    ) -> Optional[DirMetricInput]:
         if not isinstance(visitable_object, Commit):
             return None
-        self.tempdir = TemporaryDirectory(  # pylint: disable=consider-using-with
-            dir=self.base_dir
-        )
-        self.repository.checkout_tree(
-            visitable_object.tree.obj,
-            directory=self.tempdir.name,
-            strategy=GIT_CHECKOUT_FORCE,
-        )
-        is_cached = self.oid_is_cached(visitable_object.tree.id)
-        self.cache_oid(visitable_object.tree.id)
+        if self.tempdir is None:
+            self.tempdir = TemporaryDirectory(  # pylint: disable=consider-using-with
+                dir=self.base_dir
+            )
+        if not self.persistent:
+            self.checkout(visitable_object.tree, context)
+        else:
+            try:
+                self.move(visitable_object.tree, context)
+            except BaseException:
+                self.reset()  # the worktree is checked out anew next time
+                raise
+        (is_cached,) = self.oid_cache.claim((visitable_object.tree.oid,))
         return DirMetricInput(is_cached, self.tempdir.name, visitable_object.tree)
 
-    def close(self) -> None:
+    def reset(self) -> None:
         if self.tempdir is not None:
             self.tempdir.cleanup()
+        self.tempdir = None
+        self.tree = None
+        self.files = None
+
+    def close(self) -> None:
+        if not self.persistent:
+            self.reset()
 
 
 class DirMetric(BaseMetric[DirMetricInput], ABC):
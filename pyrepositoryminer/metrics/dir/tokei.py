@@ -1,20 +1,23 @@
-from asyncio import create_subprocess_exec
-from asyncio.subprocess import PIPE
+from asyncio import TimeoutError  # pylint: disable=redefined-builtin
 from json import loads
-from typing import Iterable
+from typing import Iterable, Optional
 
 from pyrepositoryminer.metrics.dir.main import DirMetric
+from pyrepositoryminer.metrics.processes import run_process
 from pyrepositoryminer.metrics.structs import DirMetricInput, Metric, ObjectIdentifier
 from pyrepositoryminer.metrics.utils import descend_tree
 
 
 class Tokei(DirMetric):
+    def cache_key(self, tup: DirMetricInput) -> Optional[str]:
+        return tup.tree.id
+
     async def analyze(self, tup: DirMetricInput) -> Iterable[Metric]:
-        p = await create_subprocess_exec(
-            "tokei", "--output", "json", tup.path, stdout=PIPE
-        )
-        stdout, _ = await p.communicate()
-        data = loads(bytes(stdout).decode("utf-8"))
+        try:
+            stdout = await run_process("tokei", "--output", "json", tup.path)
+        except TimeoutError:
+            return []  # TODO get an error output?
+        data = loads(stdout.decode("utf-8"))
         result = [
             Metric(
                 self.name,
@@ -0,0 +1,186 @@
+"""Classify the lines of a file as code, comments or blanks, like tokei.
+
+The language of a file is told by its name, the counts only by its contents,
+so the counts of a blob can be reused wherever it occurs under a name of the
+same language. Comment markers are recognized at any position of a line, but
+not told apart from the same characters inside of string literals.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class Language(NamedTuple):
+    name: str
+    line_comments: Tuple[bytes, ...] = ()
+    block_comments: Tuple[Tuple[bytes, bytes], ...] = ()
+    prose: bool = False  # every line that is not blank is a comment
+
+
+class LineCounts(NamedTuple):
+    code: int = 0
+    comments: int = 0
+    blanks: int = 0
+
+
+Comments = Tuple[Tuple[bytes, ...], Tuple[Tuple[bytes, bytes], ...]]
+C_COMMENTS: Comments = ((b"//",), ((b"/*", b"*/"),))
+HASH_COMMENTS: Comments = ((b"#",), ())
+XML_COMMENTS: Comments = ((), ((b"<!--", b"-->"),))
+
+_LANGUAGES = (
+    (Language("Bash", *HASH_COMMENTS), ("bash",), ()),
+    (Language("C", *C_COMMENTS), ("c",), ()),
+    (Language("C Header", *C_COMMENTS), ("h",), ()),
+    (Language("C#", *C_COMMENTS), ("cs",), ()),
+    (Language("C++", *C_COMMENTS), ("cc", "cpp", "cxx", "c++", "inl"), ()),
+    (Language("C++ Header", *C_COMMENTS), ("hh", "hpp", "hxx", "h++"), ()),
+    (Language("CMake", *HASH_COMMENTS), ("cmake",), ("CMakeLists.txt",)),
+    (Language("CSS", block_comments=((b"/*", b"*/"),)), ("css",), ()),
+    (Language("Dockerfile", *HASH_COMMENTS), ("dockerfile",), ("Dockerfile",)),
+    (Language("GLSL", *C_COMMENTS), ("frag", "geom", "glsl", "vert"), ()),
+    (Language("Go", *C_COMMENTS), ("go",), ()),
+    (Language("HTML", *XML_COMMENTS), ("htm", "html"), ()),
+    (Language("INI", line_comments=(b";", b"#")), ("cfg", "ini"), ()),
+    (Language("Java", *C_COMMENTS), ("java",), ()),
+    (Language("JavaScript", *C_COMMENTS), ("cjs", "js", "mjs"), ()),
+    (Language("JSON"), ("json",), ()),
+    (Language("JSX", *C_COMMENTS), ("jsx",), ()),
+    (Language("Kotlin", *C_COMMENTS), ("kt", "kts"), ()),
+    (
+        Language("Lua", line_comments=(b"--",), block_comments=((b"--[[", b"]]"),)),
+        ("lua",),
+        (),
+    ),
+    (Language("Makefile", *HASH_COMMENTS), ("mak", "mk"), ("Makefile",)),
+    (Language("Markdown", prose=True), ("markdown", "md"), ()),
+    (Language("Perl", *HASH_COMMENTS), ("pl", "pm"), ()),
+    (
+        Language("PHP", line_comments=(b"//", b"#"), block_comments=((b"/*", b"*/"),)),
+        ("php",),
+        (),
+    ),
+    (Language("Plain Text", prose=True), ("text", "txt"), ()),
+    (
+        Language(
+            "Python",
+            line_comments=(b"#",),
+            block_comments=((b'"""', b'"""'), (b"'''", b"'''")),
+        ),
+        ("py", "pyi", "pyw"),
+        (),
+    ),
+    (Language("R", *HASH_COMMENTS), ("r",), ()),
+    (Language("ReStructuredText", prose=True), ("rst",), ()),
+    (
+        Language("Ruby", line_comments=(b"#",), block_comments=((b"=begin", b"=end"),)),
+        ("rb",),
+        ("Gemfile", "Rakefile"),
+    ),
+    (Language("Rust", *C_COMMENTS), ("rs",), ()),
+    (Language("Sass", *C_COMMENTS), ("sass", "scss"), ()),
+    (Language("Scala", *C_COMMENTS), ("sc", "scala"), ()),
+    (Language("Shell", *HASH_COMMENTS), ("sh",), ()),
+    (
+        Language("SQL", line_comments=(b"--",), block_comments=((b"/*", b"*/"),)),
+        ("sql",),
+        (),
+    ),
+    (Language("Swift", *C_COMMENTS), ("swift",), ()),
+    (Language("TOML", *HASH_COMMENTS), ("toml",), ()),
+    (Language("TSX", *C_COMMENTS), ("tsx",), ()),
+    (Language("TypeScript", *C_COMMENTS), ("cts", "mts", "ts"), ()),
+    (Language("XML", *XML_COMMENTS), ("svg", "xml"), ()),
+    (Language("YAML", *HASH_COMMENTS), ("yaml", "yml"), ()),
+)
+EXTENSIONS: Dict[str, Language] = {
+    extension: language
+    for language, extensions, _ in _LANGUAGES
+    for extension in extensions
+}
+FILENAMES: Dict[str, Language] = {
+    filename: language
+    for language, _, filenames in _LANGUAGES
+    for filename in filenames
+}
+
+
+def get_language(name: str) -> Optional[Language]:
+    language = FILENAMES.get(name)
+    if language is None and "." in name:
+        language = EXTENSIONS.get(name.rpartition(".")[2].lower())
+    return language
+
+
+def _next_comment(
+    line: bytes, i: int, language: Language
+) -> Optional[Tuple[int, int, Optional[bytes]]]:
+    # the position, length and block end of the first comment start from i
+    starts = [
+        (j, len(start), None)
+        for start in language.line_comments
+        if (j := line.find(start, i)) >= 0
+    ] + [
+        (j, len(start), stop)
+        for start, stop in language.block_comments
+        if (j := line.find(start, i)) >= 0
+    ]
+    return min(starts, key=lambda s: (s[0], -s[1]), default=None)
+
+
+def _scan(
+    line: bytes, language: Language, end: Optional[bytes]
+) -> Tuple[bool, Optional[bytes]]:
+    # whether the line holds code, and the end of a block comment left open
+    has_code = False
+    i = 0
+    while i < len(line):
+        if end is not None:
+            j = line.find(end, i)
+            if j < 0:
+                return has_code, end
+            i, end = j + len(end), None
+            continue
+        comment = _next_comment(line, i, language)
+        if comment is None:
+            return has_code or bool(line[i:].strip()), None
+        j, length, stop = comment
+        has_code = has_code or bool(line[i:j].strip())
+        if stop is None:  # a line comment runs to the end of the line
+            return has_code, None
+        i, end = j + length, stop
+    return has_code, end
+
+
+def split_lines(data: bytes) -> List[bytes]:
+    lines = data.split(b"\n")
+    if lines[-1] == b"":  # the newline ends the last line, not a new one
+        lines.pop()
+    return lines
+
+
+def count_lines(data: bytes, language: Language) -> LineCounts:
+    lines = split_lines(data)
+    code = comments = blanks = 0
+    end: Optional[bytes] = None  # the end of the open block comment
+    for line in lines:
+        line = line.strip()
+        if not line:
+            blanks += 1
+            continue
+        if language.prose:
+            has_code = False
+        else:
+            has_code, end = _scan(line, language, end)
+        if has_code:
+            code += 1
+        else:
+            comments += 1
+    return LineCounts(code, comments, blanks)
+
+
+def add_counts(counts: Iterable[LineCounts]) -> LineCounts:
+    code = comments = blanks = 0
+    for count in counts:
+        code += count.code
+        comments += count.comments
+        blanks += count.blanks
+    return LineCounts(code, comments, blanks)
@@ -1,22 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import Any, Awaitable, Generic, Iterable, Set, TypeVar, final
+from typing import (
+    Any,
+    Awaitable,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    final,
+)
 
+from pyrepositoryminer.metrics.cache import OidCache
+from pyrepositoryminer.metrics.context import CommitContext
+from pyrepositoryminer.metrics.store import ResultStore
 from pyrepositoryminer.metrics.structs import BaseMetricInput, Metric
 from pyrepositoryminer.pobjects import Object
 
 
 class BaseVisitor(ABC):
     def __init__(self) -> None:
-        self.oid_cache: Set[str] = set()
-
-    def oid_is_cached(self, oid: str) -> bool:
-        return oid in self.oid_cache
-
-    def cache_oid(self, oid: str) -> None:
-        self.oid_cache.add(oid)
+        self.oid_cache = OidCache()
 
     @abstractmethod
-    def __call__(self, visitable_object: Object) -> Any:
+    def __call__(
+        self, visitable_object: Object, context: Optional[CommitContext] = None
+    ) -> Any:
         pass
 
 
@@ -24,6 +33,15 @@ T = TypeVar("T", bound=BaseMetricInput)
 
 
 class BaseMetric(Generic[T], ABC):
+    # bump the version whenever analyze changes, stored results are keyed by it
+    version: str = "1"
+    store: Optional[ResultStore] = None
+    fill_cached: bool = False
+    # the selection of files, if the stored results depend on it
+    scope: Optional[str] = None
+    # the number of objects passed to analyze_batch at once, None for one by one
+    batch_size: Optional[int] = None
+
     async def cache_hit(self, tup: T) -> Iterable[Metric]:
         return await self.analyze(tup)
 
@@ -31,11 +49,69 @@ class BaseMetric(Generic[T], ABC):
     def analyze(self, tup: T) -> Awaitable[Iterable[Metric]]:
         ...
 
+    async def analyze_batch(self, tups: Sequence[T]) -> List[Iterable[Metric]]:
+        # the results of the objects in order, override to analyze them at once
+        return [await self.analyze(tup) for tup in tups]
+
+    def cache_key(self, tup: T) -> Optional[str]:  # pylint: disable=unused-argument
+        # the key of the result in the store, None if it must not be stored
+        return None
+
+    def restore(self, tup: T, metrics: List[Metric]) -> List[Metric]:
+        # pylint: disable=unused-argument
+        return metrics
+
+    def store_key(self, tup: T) -> Optional[str]:
+        if self.store is None or (tup.is_cached and not self.fill_cached):
+            return None
+        key = self.cache_key(tup)
+        if key is not None and self.scope is not None:
+            key = f"{key}:{self.scope}"
+        return key
+
     @final
     async def __call__(self, tup: T) -> Iterable[Metric]:
+        key = self.store_key(tup)
+        if key is None or self.store is None:
+            if tup.is_cached:
+                return await self.cache_hit(tup)
+            return await self.analyze(tup)
+        stored = self.store.get(self.name, self.version, key)
+        if stored is not None:
+            return [m._replace(cached=tup.is_cached) for m in self.restore(tup, stored)]
         if tup.is_cached:
             return await self.cache_hit(tup)
-        return await self.analyze(tup)
+        result = list(await self.analyze(tup))
+        self.store.put(self.name, self.version, key, result)
+        return result
+
+    @final
+    async def batch(self, tups: Sequence[T]) -> List[Metric]:
+        """Like calling the metric for each object, but analyze them at once."""
+        results: List[Iterable[Metric]] = [()] * len(tups)
+        keys = [self.store_key(tup) for tup in tups]
+        missing: List[int] = []
+        for i, (tup, key) in enumerate(zip(tups, keys)):
+            stored = None
+            if key is not None and self.store is not None:
+                stored = self.store.get(self.name, self.version, key)
+            if stored is not None:
+                results[i] = [
+                    m._replace(cached=tup.is_cached) for m in self.restore(tup, stored)
+                ]
+            elif tup.is_cached:
+                results[i] = await self.cache_hit(tup)
+            else:
+                missing.append(i)
+        analyzed = (
+            await self.analyze_batch([tups[i] for i in missing]) if missing else []
+        )
+        for i, result in zip(missing, analyzed):
+            results[i] = result = list(result)
+            key = keys[i]
+            if key is not None and self.store is not None:
+                self.store.put(self.name, self.version, key, result)
+        return [metric for result in results for metric in result]
 
     @classmethod
     @property
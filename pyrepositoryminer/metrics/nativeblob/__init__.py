@@ -1,7 +1,9 @@
 from pyrepositoryminer.metrics.nativeblob.complexity import Complexity
 from pyrepositoryminer.metrics.nativeblob.halstead import Halstead
+from pyrepositoryminer.metrics.nativeblob.languages import Languages
 from pyrepositoryminer.metrics.nativeblob.linecount import Linecount
 from pyrepositoryminer.metrics.nativeblob.linelength import Linelength
+from pyrepositoryminer.metrics.nativeblob.linelengthsummary import Linelengthsummary
 from pyrepositoryminer.metrics.nativeblob.maintainability import Maintainability
 from pyrepositoryminer.metrics.nativeblob.nesting import Nesting
 from pyrepositoryminer.metrics.nativeblob.pylinecount import Pylinecount
@@ -16,4 +18,6 @@ __all__ = (
     "Complexity",
     "Pylinecount",
     "Linelength",
+    "Languages",
+    "Linelengthsummary",
 )
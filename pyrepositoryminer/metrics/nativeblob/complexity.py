@@ -1,8 +1,7 @@
 from typing import Iterable
 
-from radon.complexity import cc_visit
-
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
+from pyrepositoryminer.metrics.nativeblob.source import python_source
 from pyrepositoryminer.metrics.structs import (
     Metric,
     NativeBlobMetricInput,
@@ -15,7 +14,7 @@ class Complexity(NativeBlobMetric):
 
     async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
         try:
-            cc_data = cc_visit(tup.blob.data)
+            cc_data = python_source(tup.blob).complexity.blocks
         except (SyntaxError, UnicodeDecodeError):
             return []  # TODO get an error output?
         result = [
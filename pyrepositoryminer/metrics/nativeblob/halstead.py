@@ -1,8 +1,7 @@
 from typing import Iterable
 
-from radon.metrics import h_visit
-
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
+from pyrepositoryminer.metrics.nativeblob.source import python_source
 from pyrepositoryminer.metrics.structs import (
     Metric,
     NativeBlobMetricInput,
@@ -15,7 +14,7 @@ class Halstead(NativeBlobMetric):
 
     async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
         try:
-            h_data = h_visit(tup.blob.data.decode())
+            h_data = python_source(tup.blob).halstead
         except (SyntaxError, UnicodeDecodeError):
             return []  # TODO get an error output?
         result = [
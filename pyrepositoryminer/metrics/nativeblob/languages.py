@@ -0,0 +1,37 @@
+from typing import Iterable, Optional
+
+from pyrepositoryminer.metrics.languages import count_lines, get_language
+from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
+from pyrepositoryminer.metrics.structs import (
+    Metric,
+    NativeBlobMetricInput,
+    ObjectIdentifier,
+)
+
+
+def unknown_language(tup: NativeBlobMetricInput) -> bool:
+    return get_language(tup.path.rpartition("/")[2]) is None
+
+
+class Languages(NativeBlobMetric):
+    filter = NativeBlobFilter(unknown_language, NativeBlobFilter.is_binary())
+
+    def cache_key(self, tup: NativeBlobMetricInput) -> Optional[str]:
+        # the counts depend on the language, which depends on the name
+        language = get_language(tup.path.rpartition("/")[2])
+        return None if language is None else f"{tup.blob.id}:{language.name}"
+
+    async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
+        language = get_language(tup.path.rpartition("/")[2])
+        if language is None:
+            return []
+        counts = count_lines(tup.blob.obj.data, language)
+        result = [
+            Metric(
+                self.name,
+                {"language": language.name, **counts._asdict()},
+                False,
+                ObjectIdentifier(tup.blob.id, tup.path),
+            )
+        ]
+        return result
@@ -1,6 +1,4 @@
-from asyncio import create_subprocess_exec
-from asyncio.subprocess import PIPE
-from typing import Iterable
+from typing import Iterable, List, Sequence
 
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
 from pyrepositoryminer.metrics.structs import (
@@ -12,16 +10,23 @@ from pyrepositoryminer.metrics.structs import (
 
 class Linecount(NativeBlobMetric):
     filter = NativeBlobFilter(NativeBlobFilter.is_binary())
+    batch_size = 1024
 
     async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
-        p = await create_subprocess_exec("wc", "-l", stdin=PIPE, stdout=PIPE)
-        stdout, _ = await p.communicate(tup.blob.data)
-        result = [
-            Metric(
-                self.name,
-                int(stdout),
-                False,
-                ObjectIdentifier(tup.blob.id, tup.path),
-            )
+        return (await self.analyze_batch((tup,)))[0]
+
+    async def analyze_batch(
+        self, tups: Sequence[NativeBlobMetricInput]
+    ) -> List[Iterable[Metric]]:
+        # like wc -l, count the newlines, not a last line without one
+        return [
+            [
+                Metric(
+                    self.name,
+                    tup.blob.obj.data.count(b"\n"),
+                    False,
+                    ObjectIdentifier(tup.blob.id, tup.path),
+                )
+            ]
+            for tup in tups
         ]
-        return result
@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, List, Sequence
 
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
 from pyrepositoryminer.metrics.structs import (
@@ -10,16 +10,24 @@ from pyrepositoryminer.metrics.structs import (
 
 class Linelength(NativeBlobMetric):
     filter = NativeBlobFilter(NativeBlobFilter.is_binary())
+    batch_size = 1024
 
     async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
-        result = [
-            Metric(
-                self.name,
-                len(line),
-                False,
-                ObjectIdentifier(tup.blob.id, tup.path),
-                f"L{i+1}",
-            )
-            for i, line in enumerate(tup.blob.obj.data.split(b"\n"))
+        return (await self.analyze_batch((tup,)))[0]
+
+    async def analyze_batch(
+        self, tups: Sequence[NativeBlobMetricInput]
+    ) -> List[Iterable[Metric]]:
+        return [
+            [
+                Metric(
+                    self.name,
+                    len(line),
+                    False,
+                    ObjectIdentifier(tup.blob.id, tup.path),
+                    f"L{i+1}",
+                )
+                for i, line in enumerate(tup.blob.obj.data.split(b"\n"))
+            ]
+            for tup in tups
         ]
-        return result
@@ -0,0 +1,62 @@
+from bisect import bisect_left, bisect_right
+from math import ceil
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from pyrepositoryminer.metrics.languages import split_lines
+from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
+from pyrepositoryminer.metrics.structs import (
+    Metric,
+    NativeBlobMetricInput,
+    ObjectIdentifier,
+)
+
+
+class Linelengthsummary(NativeBlobMetric):
+    """Summarize the line lengths of a blob instead of a metric per line.
+
+    Subclass it as a custom metric to change what is summarized.
+    """
+
+    filter = NativeBlobFilter(NativeBlobFilter.is_binary())
+    percentiles: Tuple[float, ...] = (50, 90, 99)
+    buckets: Tuple[int, ...] = tuple(range(0, 201, 20))  # the lower bounds
+    columns: Tuple[int, ...] = (80, 100, 120)  # count the lines longer than these
+    batch_size = 1024
+
+    def summarize(self, lengths: List[int]) -> Dict[str, Any]:
+        lengths.sort()
+        n = len(lengths)
+        return {
+            "lines": n,
+            "max": lengths[-1] if n else 0,
+            "mean": sum(lengths) / n if n else 0.0,
+            "percentiles": {
+                str(p): lengths[max(ceil(p / 100 * n) - 1, 0)] if n else 0
+                for p in self.percentiles
+            },
+            # the number of lines per bucket, the last bucket is open-ended
+            "histogram": [
+                bisect_left(lengths, upper) - bisect_left(lengths, lower)
+                for lower, upper in zip(self.buckets, self.buckets[1:])
+            ]
+            + [n - bisect_left(lengths, self.buckets[-1])],
+            "over": {str(c): n - bisect_right(lengths, c) for c in self.columns},
+        }
+
+    async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
+        return (await self.analyze_batch((tup,)))[0]
+
+    async def analyze_batch(
+        self, tups: Sequence[NativeBlobMetricInput]
+    ) -> List[Iterable[Metric]]:
+        return [
+            [
+                Metric(
+                    self.name,
+                    self.summarize(list(map(len, split_lines(tup.blob.obj.data)))),
+                    False,
+                    ObjectIdentifier(tup.blob.id, tup.path),
+                )
+            ]
+            for tup in tups
+        ]
@@ -1,7 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Iterable, List, Set, Tuple
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+from pyrepositoryminer.metrics.cache import Key, Memo, OidCache, claim_levels
+from pyrepositoryminer.metrics.context import CommitContext
 from pyrepositoryminer.metrics.main import BaseMetric, BaseVisitor
+from pyrepositoryminer.metrics.paths import join
 from pyrepositoryminer.metrics.structs import (
     Metric,
     NativeBlobMetricInput,
@@ -10,40 +23,120 @@ from pyrepositoryminer.metrics.structs import (
 from pyrepositoryminer.pobjects import Blob, Commit, Object, Tree
 
 
+class Manifest(NamedTuple):
+    blobs: Tuple[str, ...]
+    trees: Tuple[str, ...]
+
+
 class NativeBlobVisitor(BaseVisitor):
-    def __call__(self, visitable_object: Object) -> Iterable[NativeBlobMetricInput]:
-        if isinstance(visitable_object, Commit):
-            visited_commit = False
-            q: List[Tuple[Object, str]] = [(visitable_object, "")]
-            while q:
-                vo, path = q.pop(0)
-                if isinstance(vo, Blob):
-                    yield NativeBlobMetricInput(
-                        self.oid_is_cached(vo.id), f"{path}/{vo.name}", vo
-                    )
-                elif isinstance(vo, Tree):
-                    p = f"{f'{path}/' if path else ''}{vo.name if vo.name else ''}"
-                    q.extend((sub_vo, p) for sub_vo in vo)
-                elif isinstance(vo, Commit) and not visited_commit:
-                    q.append((vo.tree, ""))
-                    visited_commit = True
-                self.cache_oid(vo.id)
+    """Visit the blobs of a commit.
+
+    Everything below a tree was claimed when the tree was claimed first, so
+    the visitor only descends into trees that are not cached. The blobs below
+    a cached tree are cached as well and taken from the manifests of the
+    trees, or skipped if only changed blobs are visited. A manifest that was
+    evicted from the memo is built again from its tree.
+
+    The blobs of a level are yielded as soon as the level is claimed, the
+    blobs below cached trees after the last level, so a blob is never
+    yielded cached before it is yielded where it was claimed first.
+    """
+
+    def __init__(self, changed_only: bool = False) -> None:
+        super().__init__()
+        self.changed_only = changed_only
+        self.manifests: Memo[Key, Manifest] = Memo()
+
+    def manifest(
+        self,
+        tree: Tree,
+        path: str,
+        context: Optional[CommitContext] = None,
+        entries: Optional[List[Object]] = None,
+    ) -> Manifest:
+        key = tree.oid if context is None else context.tree_key(tree, path)
+        manifest = self.manifests.get(key)
+        if manifest is None:
+            if entries is None:
+                entries = list(tree) if context is None else context.entries(tree, path)
+            manifest = Manifest(
+                tuple(obj.name for obj in entries if isinstance(obj, Blob)),
+                tuple(obj.name for obj in entries if isinstance(obj, Tree)),
+            )
+            self.manifests[key] = manifest
+        return manifest
+
+    def iter_cached(
+        self, tree: Tree, path: str, context: Optional[CommitContext] = None
+    ) -> Iterator[NativeBlobMetricInput]:
+        q: List[Tuple[Tree, str]] = [(tree, path)]
+        while q:
+            tree, path = q.pop()
+            manifest = self.manifest(tree, path, context)
+            obj: Any = tree.obj  # the pygit2 tree, entries are looked up by name
+            for name in manifest.blobs:
+                yield NativeBlobMetricInput(True, f"{path}/{name}", Blob(obj[name]))
+            for name in manifest.trees:
+                q.append((Tree(obj[name]), join(path, name)))
+
+    def __call__(
+        self, visitable_object: Object, context: Optional[CommitContext] = None
+    ) -> Iterable[NativeBlobMetricInput]:
+        if not isinstance(visitable_object, Commit):
+            return
+        commit = visitable_object
+
+        def key(vo: Object, path: str) -> Key:
+            if context is None or not isinstance(vo, Tree):
+                return vo.oid
+            return context.tree_key(vo, join(path, vo.name))
+
+        def below(vo: Object, path: str, is_cached: bool) -> List[Tuple[Object, str]]:
+            if vo is commit:
+                return [(commit.tree, "")]
+            if not isinstance(vo, Tree) or is_cached:
+                return []
+            p = join(path, vo.name)
+            entries = list(vo) if context is None else context.entries(vo, p)
+            self.manifest(vo, p, context, entries)
+            return [(sub_vo, p) for sub_vo in entries]
+
+        cached: List[Tuple[Tree, str]] = []
+        roots: List[Tuple[Object, str]] = [(commit, "")]
+        levels = claim_levels(self.oid_cache, roots, key, below)
+        for vo, path, is_cached in levels:
+            if isinstance(vo, Tree):
+                if is_cached and not self.changed_only:
+                    cached.append((vo, join(path, vo.name)))
+            elif isinstance(vo, Blob) and not (is_cached and self.changed_only):
+                yield NativeBlobMetricInput(is_cached, f"{path}/{vo.name}", vo)
+        for tree, path in cached:
+            yield from self.iter_cached(tree, path, context)
 
 
 class NativeBlobFilter:
     def __init__(self, *filters: Callable[[NativeBlobMetricInput], bool]) -> None:
         self.filters = filters
-        self.cached_oids: Set[str] = set()
+        self.cached_oids = OidCache()
 
     def __call__(self, tup: NativeBlobMetricInput) -> bool:
-        if tup.is_cached:
-            if tup.blob.id in self.cached_oids:
-                return True
-        else:
-            if any(f(tup) for f in self.filters):
-                self.cached_oids.add(tup.blob.id)
-                return True
-        return False
+        return self.select((tup,))[0]
+
+    def select(
+        self, tups: Sequence[NativeBlobMetricInput], release: bool = True
+    ) -> List[bool]:
+        # a cached blob is filtered iff it was filtered when it was first seen
+        rejected = [
+            not tup.is_cached and any(f(tup) for f in self.filters) for tup in tups
+        ]
+        cached = iter(
+            self.cached_oids.settle(
+                (tup.blob.oid for tup, r in zip(tups, rejected) if r),
+                (tup.blob.oid for tup in tups if tup.is_cached),
+                release,
+            )
+        )
+        return [next(cached) if tup.is_cached else r for tup, r in zip(tups, rejected)]
 
     @staticmethod
     def endswith(ending: str) -> Callable[[NativeBlobMetricInput], bool]:
@@ -71,6 +164,23 @@ class NativeBlobMetric(BaseMetric[NativeBlobMetricInput], ABC):
             )
         ]
 
+    def cache_key(self, tup: NativeBlobMetricInput) -> Optional[str]:
+        return tup.blob.id
+
+    def restore(
+        self, tup: NativeBlobMetricInput, metrics: List[Metric]
+    ) -> List[Metric]:
+        # a blob is stored once, but may be found under several paths
+        obj = ObjectIdentifier(tup.blob.id, tup.path)
+        return [
+            (
+                m._replace(object=obj)
+                if m.object is not None and m.object.oid == obj.oid
+                else m
+            )
+            for m in metrics
+        ]
+
     @staticmethod
     @abstractmethod
     def filter(tup: NativeBlobMetricInput) -> bool:
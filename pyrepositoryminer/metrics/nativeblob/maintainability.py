@@ -1,8 +1,7 @@
 from typing import Iterable
 
-from radon.metrics import mi_visit
-
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
+from pyrepositoryminer.metrics.nativeblob.source import python_source
 from pyrepositoryminer.metrics.structs import (
     Metric,
     NativeBlobMetricInput,
@@ -15,7 +14,7 @@ class Maintainability(NativeBlobMetric):
 
     async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
         try:
-            mi_data = mi_visit(tup.blob.data.decode(), multi=True)
+            mi_data = python_source(tup.blob).maintainability
         except (SyntaxError, UnicodeDecodeError):
             return []  # TODO get an error output?
         result = [
@@ -11,12 +11,12 @@ from ast import (
     Try,
     While,
     With,
-    parse,
     withitem,
 )
 from typing import Iterable
 
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
+from pyrepositoryminer.metrics.nativeblob.source import python_source
 from pyrepositoryminer.metrics.structs import (
     Metric,
     NativeBlobMetricInput,
@@ -31,7 +31,7 @@ class Nesting(NativeBlobMetric):
         result = [
             Metric(
                 self.name,
-                NestingASTVisitor().visit(parse(tup.blob.obj.data)).result,
+                NestingASTVisitor().visit(python_source(tup.blob).module).result,
                 False,
                 ObjectIdentifier(tup.blob.id, tup.path),
             )
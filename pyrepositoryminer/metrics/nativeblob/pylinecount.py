@@ -1,4 +1,4 @@
-from typing import Iterable
+from typing import Iterable, List, Sequence
 
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
 from pyrepositoryminer.metrics.structs import (
@@ -10,14 +10,22 @@ from pyrepositoryminer.metrics.structs import (
 
 class Pylinecount(NativeBlobMetric):
     filter = NativeBlobFilter(NativeBlobFilter.is_binary())
+    batch_size = 1024
 
     async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
-        result = [
-            Metric(
-                self.name,
-                tup.blob.obj.data.count(b"\n") + 1,
-                False,
-                ObjectIdentifier(tup.blob.id, tup.path),
-            )
+        return (await self.analyze_batch((tup,)))[0]
+
+    async def analyze_batch(
+        self, tups: Sequence[NativeBlobMetricInput]
+    ) -> List[Iterable[Metric]]:
+        return [
+            [
+                Metric(
+                    self.name,
+                    tup.blob.obj.data.count(b"\n") + 1,
+                    False,
+                    ObjectIdentifier(tup.blob.id, tup.path),
+                )
+            ]
+            for tup in tups
         ]
-        return result
@@ -1,8 +1,7 @@
 from typing import Iterable
 
-from radon.raw import analyze
-
 from pyrepositoryminer.metrics.nativeblob.main import NativeBlobFilter, NativeBlobMetric
+from pyrepositoryminer.metrics.nativeblob.source import python_source
 from pyrepositoryminer.metrics.structs import (
     Metric,
     NativeBlobMetricInput,
@@ -15,7 +14,7 @@ class Raw(NativeBlobMetric):
 
     async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
         try:
-            r_data = analyze(tup.blob.data.decode())
+            r_data = python_source(tup.blob).raw
         except (SyntaxError, UnicodeDecodeError):
             return []  # TODO get an error output?
         result = [
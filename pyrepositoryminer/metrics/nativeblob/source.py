@@ -0,0 +1,70 @@
+"""Analyze the source of a Python blob once for all Python metrics.
+
+The metrics of a blob share one `PythonSource` while they share the blob. It
+parses the blob at most once, straight from the memory of the blob, and keeps
+the radon results the metrics are derived from.
+"""
+from ast import Module, parse
+from functools import cached_property
+from weakref import WeakKeyDictionary, proxy
+
+from radon.metrics import Halstead, h_visit_ast, mi_compute
+from radon.raw import Module as RawModule
+from radon.raw import analyze
+from radon.visitors import ComplexityVisitor
+
+from pyrepositoryminer.pobjects import Blob
+
+
+class PythonSource:
+    """The intermediate results of the Python metrics of a blob.
+
+    Every result is computed on first use. A result that cannot be computed
+    raises on use, so a metric only fails for the results it uses.
+    """
+
+    def __init__(self, blob: Blob) -> None:
+        # a source must not keep its blob, the key of the source, alive
+        self.blob = proxy(blob)
+
+    @cached_property
+    def module(self) -> Module:
+        # parsed from the bytes to honor an encoding declaration or a BOM
+        buffer: memoryview = self.blob.buffer
+        return parse(buffer)
+
+    @cached_property
+    def raw(self) -> RawModule:
+        return analyze(self.blob.text)
+
+    @cached_property
+    def halstead(self) -> Halstead:
+        return h_visit_ast(self.module)
+
+    @cached_property
+    def complexity(self) -> ComplexityVisitor:
+        return ComplexityVisitor.from_ast(self.module)
+
+    @cached_property
+    def maintainability(self) -> float:
+        # radon's mi_visit with multi-line strings counted as comments
+        raw = self.raw
+        comments = (raw.comments + raw.multi) / raw.sloc * 100 if raw.sloc else 0
+        return float(
+            mi_compute(
+                self.halstead.total.volume,
+                self.complexity.total_complexity,
+                raw.lloc,
+                comments,
+            )
+        )
+
+
+_sources: "WeakKeyDictionary[Blob, PythonSource]" = WeakKeyDictionary()
+
+
+def python_source(blob: Blob) -> PythonSource:
+    source = _sources.get(blob)
+    if source is None:
+        source = _sources[blob] = PythonSource(blob)
+    return source
@@ -1,6 +1,15 @@
 from pyrepositoryminer.metrics.nativetree.blobcount import Blobcount
 from pyrepositoryminer.metrics.nativetree.cacherate import CacheRate
+from pyrepositoryminer.metrics.nativetree.languagetotals import Languagetotals
 from pyrepositoryminer.metrics.nativetree.loc import Loc
+from pyrepositoryminer.metrics.nativetree.touchedlinecount import TouchedLineCount
 from pyrepositoryminer.metrics.nativetree.touchedlines import TouchedLines
 
-__all__ = ("Blobcount", "Loc", "CacheRate", "TouchedLines")
+__all__ = (
+    "Blobcount",
+    "Loc",
+    "CacheRate",
+    "TouchedLines",
+    "Languagetotals",
+    "TouchedLineCount",
+)
@@ -1,18 +1,24 @@
-from typing import Iterable, List
+from typing import Iterable, Optional
 
-from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric
+from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric, TreeAggregate
 from pyrepositoryminer.metrics.structs import Metric, NativeTreeMetricInput
-from pyrepositoryminer.pobjects import Blob, Object, Tree
+from pyrepositoryminer.pobjects import Blob
+
+
+class BlobAggregate(TreeAggregate[int]):
+    def combine(self, values: Iterable[int]) -> int:
+        return sum(values)
+
+    def blob(self, blob: Blob) -> int:
+        return 1
 
 
 class Blobcount(NativeTreeMetric):
+    def __init__(self) -> None:
+        self.blobs = BlobAggregate()
+
+    def cache_key(self, tup: NativeTreeMetricInput) -> Optional[str]:
+        return tup.tree.id
+
     async def analyze(self, tup: NativeTreeMetricInput) -> Iterable[Metric]:
-        n = 0
-        q: List[Object] = [tup.tree]
-        while q:
-            obj = q.pop(0)
-            if isinstance(obj, Blob):
-                n += 1
-            elif isinstance(obj, Tree):
-                q.extend(list(obj))
-        return [Metric(self.name, n, False)]
+        return [Metric(self.name, self.blobs(tup.tree, tup.context), False)]
@@ -1,13 +1,37 @@
-from typing import Dict, Iterable, List, Set
+from typing import Dict, Iterable, List, Tuple
 
-from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric
+from pyrepositoryminer.metrics.cache import Key, OidCache, claim_levels
+from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric, TreeAggregate
+from pyrepositoryminer.metrics.paths import join
 from pyrepositoryminer.metrics.structs import Metric, NativeTreeMetricInput
 from pyrepositoryminer.pobjects import Blob, Object, Tree
 
+Counts = Tuple[int, int, int]  # trees, blobs and other objects
+
+
+class CountAggregate(TreeAggregate[Counts]):
+    def combine(self, values: Iterable[Counts]) -> Counts:
+        trees, blobs, other = 0, 0, 0
+        for value in values:
+            trees += value[0]
+            blobs += value[1]
+            other += value[2]
+        return trees, blobs, other
+
+    def blob(self, blob: Blob) -> Counts:
+        return 0, 1, 0
+
+    def tree(self, tree: Tree) -> Counts:
+        return 1, 0, 0
+
+    def other(self, obj: Object) -> Counts:
+        return 0, 0, 1
+
 
 class CacheRate(NativeTreeMetric):
     def __init__(self) -> None:
-        self.cache: Set[str] = set()
+        self.cache = OidCache()
+        self.counts = CountAggregate()
 
     async def analyze(self, tup: NativeTreeMetricInput) -> Iterable[Metric]:
         rate: Dict[str, Dict[bool, int]] = {
@@ -15,16 +39,31 @@ class CacheRate(NativeTreeMetric):
             "trees": {True: 0, False: 0},
             "other": {True: 0, False: 0},
         }
-        q: List[Object] = [tup.tree]
-        while q:
-            obj = q.pop(0)
-            is_cached = obj.id in self.cache
+        context = tup.context
+
+        def key(obj: Object, path: str) -> Key:
+            if context is None or not isinstance(obj, Tree):
+                return obj.oid
+            return context.tree_key(obj, path)
+
+        def below(obj: Object, path: str, is_cached: bool) -> List[Tuple[Object, str]]:
+            if not isinstance(obj, Tree) or is_cached:
+                return []
+            entries = obj if context is None else context.entries(obj, path)
+            return [(o, join(path, o.name)) for o in entries]
+
+        # everything below a cached tree was claimed with it before
+        roots: List[Tuple[Object, str]] = [(tup.tree, "")]
+        for obj, path, is_cached in claim_levels(self.cache, roots, key, below):
             if isinstance(obj, Tree):
-                q.extend(list(obj))
                 rate["trees"][is_cached] += 1
+                if is_cached:
+                    trees, blobs, other = self.counts(obj, context, path)
+                    rate["trees"][True] += trees
+                    rate["blobs"][True] += blobs
+                    rate["other"][True] += other
             elif isinstance(obj, Blob):
                 rate["blobs"][is_cached] += 1
             else:
                 rate["other"][is_cached] += 1
-            self.cache.add(obj.id)
         return [Metric(self.name, rate, False)]
@@ -0,0 +1,56 @@
+from typing import Dict, Iterable, Optional
+
+from pyrepositoryminer.metrics.cache import Key
+from pyrepositoryminer.metrics.languages import (
+    LineCounts,
+    add_counts,
+    count_lines,
+    get_language,
+)
+from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric, TreeAggregate
+from pyrepositoryminer.metrics.structs import Metric, NativeTreeMetricInput
+from pyrepositoryminer.pobjects import Blob
+
+
+class LanguageAggregate(TreeAggregate[Dict[str, LineCounts]]):
+    memoize_blobs = True
+
+    def blob_key(self, blob: Blob) -> Key:
+        language = get_language(blob.name)
+        return blob.oid if language is None else (blob.oid, language.name)
+
+    def combine(self, values: Iterable[Dict[str, LineCounts]]) -> Dict[str, LineCounts]:
+        result: Dict[str, LineCounts] = {}
+        for value in values:
+            for name, counts in value.items():
+                result[name] = (
+                    add_counts((result[name], counts)) if name in result else counts
+                )
+        return result
+
+    def blob(self, blob: Blob) -> Dict[str, LineCounts]:
+        language = get_language(blob.name)
+        if language is None or blob.is_binary:
+            return {}
+        return {language.name: count_lines(blob.obj.data, language)}
+
+
+class Languagetotals(NativeTreeMetric):
+    """The lines of code, comments and blanks of a commit per language."""
+
+    def __init__(self) -> None:
+        self.languages = LanguageAggregate()
+
+    def cache_key(self, tup: NativeTreeMetricInput) -> Optional[str]:
+        return tup.tree.id
+
+    async def analyze(self, tup: NativeTreeMetricInput) -> Iterable[Metric]:
+        languages = self.languages(tup.tree, tup.context)
+        total = add_counts(languages.values())
+        value = {
+            **total._asdict(),
+            "languages": {
+                name: counts._asdict() for name, counts in sorted(languages.items())
+            },
+        }
+        return [Metric(self.name, value, False)]
@@ -1,20 +1,28 @@
-from typing import Iterable, List
+from typing import Iterable, Optional
 
-from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric
+from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric, TreeAggregate
 from pyrepositoryminer.metrics.structs import Metric, NativeTreeMetricInput
-from pyrepositoryminer.pobjects import Blob, Object, Tree
+from pyrepositoryminer.pobjects import Blob
+
+
+class LocAggregate(TreeAggregate[int]):
+    memoize_blobs = True  # unchanged blobs of changed trees are not read again
+
+    def combine(self, values: Iterable[int]) -> int:
+        return sum(values)
+
+    def blob(self, blob: Blob) -> int:
+        if blob.is_binary:
+            return 0
+        return blob.data.count(b"\n") + 1
 
 
 class Loc(NativeTreeMetric):
+    def __init__(self) -> None:
+        self.loc = LocAggregate()
+
+    def cache_key(self, tup: NativeTreeMetricInput) -> Optional[str]:
+        return tup.tree.id
+
     async def analyze(self, tup: NativeTreeMetricInput) -> Iterable[Metric]:
-        n = 0
-        q: List[Object] = [tup.tree]
-        while q:
-            obj = q.pop(0)
-            if isinstance(obj, Blob):
-                if obj.is_binary:
-                    continue
-                n += obj.data.count(b"\n") + 1
-            elif isinstance(obj, Tree):
-                q.extend(list(obj))
-        return [Metric(self.name, n, False)]
+        return [Metric(self.name, self.loc(tup.tree, tup.context), False)]
@@ -1,23 +1,121 @@
-from abc import ABC
-from typing import Optional
+from abc import ABC, abstractmethod
+from typing import Any, Generic, Iterable, Iterator, List, NamedTuple, Optional, TypeVar
 
+from pyrepositoryminer.metrics.cache import Key, Memo
+from pyrepositoryminer.metrics.context import CommitContext
 from pyrepositoryminer.metrics.main import BaseMetric, BaseVisitor
+from pyrepositoryminer.metrics.paths import join
 from pyrepositoryminer.metrics.structs import NativeTreeMetricInput
-from pyrepositoryminer.pobjects import Commit, Object
+from pyrepositoryminer.metrics.utils import DiffOptions
+from pyrepositoryminer.pobjects import Blob, Commit, Object, Tree
+
+V = TypeVar("V")
 
 
 class NativeTreeVisitor(BaseVisitor):
-    def __call__(self, visitable_object: Object) -> Optional[NativeTreeMetricInput]:
+    def __call__(
+        self, visitable_object: Object, context: Optional[CommitContext] = None
+    ) -> Optional[NativeTreeMetricInput]:
         if not isinstance(visitable_object, Commit):
             return None
-        output = NativeTreeMetricInput(
-            self.oid_is_cached(visitable_object.tree.id),
-            visitable_object.tree,
-            visitable_object,
+        (is_cached,) = self.oid_cache.claim((visitable_object.tree.oid,))
+        return NativeTreeMetricInput(
+            is_cached, visitable_object.tree, visitable_object, context
         )
-        self.cache_oid(visitable_object.tree.id)
-        return output
 
 
 class NativeTreeMetric(BaseMetric[NativeTreeMetricInput], ABC):
     pass
+
+
+def diff_key(tup: NativeTreeMetricInput) -> str:
+    # the key of a result computed from the diffs of the commit
+    options = DiffOptions() if tup.context is None else tup.context.diff_options
+    return f"{tup.commit.id}:{options}" if str(options) else tup.commit.id
+
+
+class Frame(NamedTuple):
+    tree: Tree
+    path: str
+    entries: Iterator[Object]
+    values: List[Any]  # the values of the entries done
+
+
+class TreeAggregate(ABC, Generic[V]):
+    """Aggregate a value over the entries of a tree, memoized by tree oid.
+
+    The value of a tree combines the values of its entries, the value of a
+    subtree entry combines `tree` with the value of the subtree. Trees that
+    were aggregated before are not descended again, unless their value was
+    evicted from the memo.
+    """
+
+    memoize_blobs = False
+
+    def __init__(self) -> None:
+        self.trees: Memo[Key, V] = Memo()
+        self.blobs: Memo[Key, V] = Memo()
+
+    @abstractmethod
+    def combine(self, values: Iterable[V]) -> V:
+        pass
+
+    @abstractmethod
+    def blob(self, blob: Blob) -> V:
+        pass
+
+    def tree(self, tree: Tree) -> V:  # pylint: disable=unused-argument
+        return self.combine(())
+
+    def other(self, obj: Object) -> V:  # pylint: disable=unused-argument
+        return self.combine(())
+
+    def blob_key(self, blob: Blob) -> Key:
+        # the key of a memoized blob, if its value depends on more than the oid
+        return blob.oid
+
+    def value(self, obj: Object) -> V:
+        if not isinstance(obj, Blob):
+            return self.other(obj)
+        if not self.memoize_blobs:
+            return self.blob(obj)
+        blob_key = self.blob_key(obj)
+        value = self.blobs.get(blob_key)
+        if value is None:
+            value = self.blobs[blob_key] = self.blob(obj)
+        return value
+
+    def __call__(
+        self, tree: Tree, context: Optional[CommitContext] = None, path: str = ""
+    ) -> V:
+        def key(tree: Tree, path: str) -> Key:
+            return tree.oid if context is None else context.tree_key(tree, path)
+
+        def frame(tree: Tree, path: str) -> Frame:
+            entries = list(tree) if context is None else context.entries(tree, path)
+            return Frame(tree, path, iter(entries), [])
+
+        value = self.trees.get(key(tree, path))
+        if value is not None:
+            return value
+        # post-order, a frame is combined once the values of its entries are done
+        stack = [frame(tree, path)]
+        while True:
+            top = stack[-1]
+            for entry in top.entries:
+                if not isinstance(entry, Tree):
+                    top.values.append(self.value(entry))
+                    continue
+                p = join(top.path, entry.name)
+                value = self.trees.get(key(entry, p))
+                if value is None:
+                    stack.append(frame(entry, p))
+                    break
+                top.values.append(self.combine((self.tree(entry), value)))
+            else:
+                stack.pop()
+                value = self.combine(top.values)
+                self.trees[key(top.tree, top.path)] = value
+                if not stack:
+                    return value
+                stack[-1].values.append(self.combine((self.tree(top.tree), value)))
@@ -0,0 +1,54 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pyrepositoryminer.metrics.context import CommitContext
+from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric, diff_key
+from pyrepositoryminer.metrics.structs import (
+    Metric,
+    NativeTreeMetricInput,
+    ObjectIdentifier,
+)
+
+
+class TouchedLineCount(NativeTreeMetric):
+    """The number of added and deleted lines of a commit, in total and per file.
+
+    The counts are taken from the line stats libgit2 computes for a patch,
+    the lines themselves are output by TouchedLines.
+    """
+
+    def cache_key(self, tup: NativeTreeMetricInput) -> Optional[str]:
+        return diff_key(tup)
+
+    async def analyze(self, tup: NativeTreeMetricInput) -> Iterable[Metric]:
+        context = CommitContext(tup.commit) if tup.context is None else tup.context
+        files: Dict[Tuple[str, str], List[int]] = {}
+        for diff in context.diffs:
+            for i, delta in enumerate(diff.deltas):
+                if not context.selects_delta(delta):
+                    continue
+                # a deleted file is identified by its old oid
+                file = delta.old_file if delta.status_char() == "D" else delta.new_file
+                _, added, deleted = diff[i].line_stats
+                counts = files.setdefault((str(file.id), file.path), [0, 0])
+                counts[0] += added
+                counts[1] += deleted
+        result = [
+            Metric(
+                self.name,
+                {"added": added, "deleted": deleted},
+                False,
+                ObjectIdentifier(oid, path),
+            )
+            for (oid, path), (added, deleted) in files.items()
+        ]
+        result.append(
+            Metric(
+                self.name,
+                {
+                    "added": sum(added for added, _ in files.values()),
+                    "deleted": sum(deleted for _, deleted in files.values()),
+                },
+                False,
+            )
+        )
+        return result
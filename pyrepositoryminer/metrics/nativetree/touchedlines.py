@@ -1,6 +1,7 @@
-from typing import Iterable
+from typing import Iterable, Optional
 
-from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric
+from pyrepositoryminer.metrics.context import CommitContext
+from pyrepositoryminer.metrics.nativetree.main import NativeTreeMetric, diff_key
 from pyrepositoryminer.metrics.structs import Metric, NativeTreeMetricInput
 
 # optionally filter the files with
@@ -12,21 +13,18 @@ from pyrepositoryminer.metrics.structs import Metric, NativeTreeMetricInput
 
 
 class TouchedLines(NativeTreeMetric):
-    async def analyze(self, tup: NativeTreeMetricInput) -> Iterable[Metric]:
-        parent_trees = tuple(parent.tree.obj for parent in tup.commit.parents)
-        if not parent_trees:  # orphan commit is diffed to empty tree
-            diffs = [tup.tree.obj.diff_to_tree(swap=True)]
+    def cache_key(self, tup: NativeTreeMetricInput) -> Optional[str]:
+        return diff_key(tup)
 
-        else:
-            diffs = [
-                tup.tree.obj.diff_to_tree(parent_tree, swap=True)
-                for parent_tree in parent_trees
-            ]
+    async def analyze(self, tup: NativeTreeMetricInput) -> Iterable[Metric]:
+        context = CommitContext(tup.commit) if tup.context is None else tup.context
+        # select the deltas before their patches are built from the blobs
         touched_lines = [
             line.content
-            for diff in diffs
-            for patch in diff
-            for hunk in patch.hunks
+            for diff in context.diffs
+            for i, delta in enumerate(diff.deltas)
+            if context.selects_delta(delta)
+            for hunk in diff[i].hunks
             for line in hunk.lines
             if line.content_offset > -1
         ]
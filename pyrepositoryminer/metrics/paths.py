@@ -0,0 +1,90 @@
+from fnmatch import translate
+from re import compile as re_compile
+from typing import Any, Optional, Pattern, Sequence, Tuple
+
+from pygit2 import Oid
+
+from pyrepositoryminer.metrics.cache import Memo
+
+
+def join(path: str, name: str) -> str:
+    return f"{path}/{name}" if path else name
+
+
+def _compile(patterns: Sequence[str]) -> Tuple[Optional[Pattern[str]], ...]:
+    # patterns without a slash match a name at any depth, others the whole path
+    patterns = tuple(pattern.strip("/") for pattern in patterns)
+    names = [translate(p) for p in patterns if "/" not in p]
+    paths = [translate(p) for p in patterns if "/" in p]
+    return (
+        re_compile("|".join(names)) if names else None,
+        re_compile("|".join(paths)) if paths else None,
+    )
+
+
+def _matches(patterns: Tuple[Optional[Pattern[str]], ...], path: str) -> bool:
+    names, paths = patterns
+    return bool(
+        (names is not None and names.match(path.rpartition("/")[2]))
+        or (paths is not None and paths.match(path))
+    )
+
+
+class PathFilter:
+    """Select the paths of a tree by glob patterns.
+
+    An excluded directory is excluded with all of its contents, a file is
+    selected if it is not excluded and matches an include pattern, if any.
+    Patterns without a slash match the name of a file or directory at any
+    depth, patterns with a slash match the whole path from the root.
+    """
+
+    def __init__(self, include: Sequence[str] = (), exclude: Sequence[str] = ()):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self._include = _compile(self.include)
+        self._exclude = _compile(self.exclude)
+
+    def __str__(self) -> str:
+        return f"{sorted(self.include)}{sorted(self.exclude)}"
+
+    def excludes(self, path: str) -> bool:
+        """Whether a directory or file is excluded, not regarding its parents."""
+        return _matches(self._exclude, path)
+
+    def selects(self, path: str, is_dir: bool = False) -> bool:
+        """Whether a path is selected, not regarding its parents."""
+        if self.excludes(path):
+            return False
+        return is_dir or not self.include or _matches(self._include, path)
+
+    def selects_file(self, path: str) -> bool:
+        """Whether a file is selected, regarding its parent directories."""
+        parts = path.split("/")
+        return not any(
+            self.excludes("/".join(parts[:i])) for i in range(1, len(parts))
+        ) and self.selects(path)
+
+
+class SizeFilter:
+    """Select the blobs up to a size.
+
+    The size is read from the header of the object, so a blob that is not
+    selected is never inflated. A blob is selected or not wherever it occurs,
+    the answers are memoized by raw oid.
+    """
+
+    def __init__(self, odb: Any, max_size: int) -> None:
+        self.odb = odb
+        self.max_size = max_size
+        self.selected: Memo[bytes, bool] = Memo()
+
+    def __str__(self) -> str:
+        return f"<={self.max_size}"
+
+    def selects(self, oid: Oid) -> bool:
+        selected = self.selected.get(oid.raw)
+        if selected is None:
+            _, size = self.odb.read_header(oid)
+            selected = self.selected[oid.raw] = size <= self.max_size
+        return selected
@@ -0,0 +1,56 @@
+"""Run external tools for the metrics of a worker with bounded concurrency.
+
+All futures of a commit are created at once, so a metric that runs a process
+per object would start them all at the same moment. Metrics, custom metrics
+included, run their tools with `run_process` instead, which waits for one of
+`limit` slots and kills a process that exceeds the timeout.
+"""
+from asyncio import (  # pylint: disable=redefined-builtin
+    Semaphore,
+    TimeoutError,
+    create_subprocess_exec,
+    wait_for,
+)
+from asyncio.subprocess import DEVNULL, PIPE
+from os import cpu_count
+from typing import Optional
+
+
+class ProcessExecutor:
+    def __init__(self, limit: Optional[int] = None, timeout: Optional[float] = None):
+        self.limit = limit
+        self.timeout = timeout
+        self._semaphore: Optional[Semaphore] = None
+
+    @property
+    def semaphore(self) -> Semaphore:
+        # created on first use, in the event loop of the worker
+        if self._semaphore is None:
+            self._semaphore = Semaphore(self.limit or cpu_count() or 1)
+        return self._semaphore
+
+    async def run(self, *args: str, stdin: Optional[bytes] = None) -> bytes:
+        """Run a command and return its stdout, raise TimeoutError on timeout."""
+        async with self.semaphore:
+            p = await create_subprocess_exec(
+                *args, stdin=DEVNULL if stdin is None else PIPE, stdout=PIPE
+            )
+            try:
+                stdout, _ = await wait_for(p.communicate(stdin), self.timeout)
+            except TimeoutError:
+                p.kill()
+                await p.wait()
+                raise
+        return bytes(stdout)
+
+
+executor = ProcessExecutor()
+
+
+def configure(limit: Optional[int] = None, timeout: Optional[float] = None) -> None:
+    global executor  # pylint: disable=global-statement
+    executor = ProcessExecutor(limit, timeout)
+
+
+async def run_process(*args: str, stdin: Optional[bytes] = None) -> bytes:
+    return await executor.run(*args, stdin=stdin)
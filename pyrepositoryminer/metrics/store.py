@@ -0,0 +1,73 @@
+from json import dumps, loads
+from pathlib import Path
+from sqlite3 import connect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pyrepositoryminer.metrics.structs import Metric, ObjectIdentifier
+
+Key = Tuple[str, str, str]
+
+
+class ResultStore:
+    """Persist metric results across runs.
+
+    Results are keyed by metric name, metric version and a metric-defined key,
+    usually the oid of the analyzed object. Writes are buffered and written in
+    one transaction per `flush`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.connection = connect(str(path), timeout=60.0)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "metric TEXT NOT NULL, version TEXT NOT NULL, key TEXT NOT NULL, "
+            "metrics TEXT NOT NULL, PRIMARY KEY (metric, version, key)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.commit()
+        self.pending: Dict[Key, str] = {}
+
+    def get(self, metric: str, version: str, key: str) -> Optional[List[Metric]]:
+        data = self.pending.get((metric, version, key))
+        if data is None:
+            row = self.connection.execute(
+                "SELECT metrics FROM results WHERE metric=? AND version=? AND key=?",
+                (metric, version, key),
+            ).fetchone()
+            if row is None:
+                return None
+            data = row[0]
+        return [
+            Metric(
+                name,
+                value,
+                False,
+                None if obj is None else ObjectIdentifier(*obj),
+                subobject,
+            )
+            for name, value, obj, subobject in loads(data)
+        ]
+
+    def put(
+        self, metric: str, version: str, key: str, metrics: Iterable[Metric]
+    ) -> None:
+        self.pending[(metric, version, key)] = dumps(
+            [[m.name, m.value, m.object, m.subobject] for m in metrics],
+            separators=(",", ":"),
+        )
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                ((*key, data) for key, data in self.pending.items()),
+            )
+        self.pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self.connection.close()
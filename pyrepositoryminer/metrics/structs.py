@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from typing import Any, NamedTuple, Optional
 
+from pyrepositoryminer.metrics.context import CommitContext
 from pyrepositoryminer.pobjects import Blob, Commit, Tree
 
 
@@ -19,6 +20,7 @@ class DirMetricInput(BaseMetricInput):
 class NativeTreeMetricInput(BaseMetricInput):
     tree: Tree
     commit: Commit
+    context: Optional[CommitContext] = None
 
 
 @dataclass(frozen=True)
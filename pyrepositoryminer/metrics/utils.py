@@ -1,20 +1,63 @@
 from functools import reduce
-from typing import FrozenSet
+from typing import FrozenSet, List, NamedTuple, Optional
 
+from pygit2 import GIT_DIFF_FIND_COPIES, GIT_DIFF_FIND_RENAMES, Diff
 from pygit2._pygit2 import DiffFile
 
 from pyrepositoryminer.pobjects import Commit, Tree
 
 
-def get_touchedfiles(commit: Commit) -> FrozenSet[DiffFile]:
-    if not commit.parents:
-        return frozenset(
-            delta.new_file for delta in commit.tree.obj.diff_to_tree(swap=True).deltas
+class DiffOptions(NamedTuple):
+    first_parent: bool = False  # diff merge commits only to their first parent
+    find_renames: bool = False
+    find_copies: bool = False
+    rename_threshold: int = 50  # the percentage of similarity of a rename
+    copy_threshold: int = 50
+
+    def __str__(self) -> str:
+        # the options that differ from the defaults
+        return ",".join(
+            f"{name}={value}"
+            for name, value in self._asdict().items()
+            if value != self._field_defaults[name]
         )
+
+    @property
+    def find_flags(self) -> int:
+        return (GIT_DIFF_FIND_RENAMES if self.find_renames else 0) | (
+            GIT_DIFF_FIND_COPIES if self.find_copies else 0
+        )
+
+
+def get_diffs(commit: Commit, options: DiffOptions = DiffOptions()) -> List[Diff]:
+    parents = commit.parents[:1] if options.first_parent else commit.parents
+    if not parents:  # orphan commit is diffed to empty tree
+        diffs = [commit.tree.obj.diff_to_tree(swap=True)]
+    else:
+        diffs = [
+            commit.tree.obj.diff_to_tree(parent.tree.obj, swap=True)
+            for parent in parents
+        ]
+    if options.find_flags:
+        for diff in diffs:
+            diff.find_similar(
+                options.find_flags,
+                rename_threshold=options.rename_threshold,
+                copy_threshold=options.copy_threshold,
+            )
+    return diffs
+
+
+def get_touchedfiles(
+    commit: Commit, diffs: Optional[List[Diff]] = None
+) -> FrozenSet[DiffFile]:
+    diffs = get_diffs(commit) if diffs is None else diffs
+    if not commit.parents:
+        return frozenset(delta.new_file for delta in diffs[0].deltas)
     return frozenset(
         delta.new_file
-        for parent in commit.parents
-        for delta in commit.tree.obj.diff_to_tree(parent.tree.obj, swap=True).deltas
+        for diff in diffs
+        for delta in diff.deltas
         if delta.status_char() != "D"
     )
 
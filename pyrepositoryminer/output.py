@@ -1,5 +1,5 @@
 from json import dumps
-from typing import Any, Dict, Iterable, List, TypedDict
+from typing import Any, Dict, Iterable, List, Tuple, TypedDict
 
 from pygit2 import Commit, Signature
 
@@ -29,7 +29,11 @@ class SignatureOutput(TypedDict):
     time: int
 
 
-class CommitOutput(ObjectOutput):
+class CommitIndexOutput(TypedDict, total=False):
+    index: int  # the position of the commit in the input, if output is unordered
+
+
+class CommitOutput(ObjectOutput, CommitIndexOutput):
     author: SignatureOutput
     commit_time: int
     commit_time_offset: int
@@ -48,57 +52,62 @@ def parse_signature(signature: Signature) -> SignatureOutput:
     )
 
 
+class OutputBuilder:
+    """Build the output of a commit from its metrics, in the order they arrive."""
+
+    def __init__(self) -> None:
+        self.metrics: List[Metric] = []
+        self.objects: Dict[str, SuperObjectOutput] = {}
+        self.subobjects: Dict[Tuple[str, str], ObjectOutput] = {}
+
+    def add(self, metrics: Iterable[AnalysisMetric]) -> None:
+        for metric in metrics:
+            m = Metric(name=metric.name, cached=metric.cached, value=metric.value)
+            if metric.object is None:
+                self.metrics.append(m)
+                continue
+            oid = metric.object.oid
+            obj = self.objects.get(oid)
+            if obj is None:
+                obj = SuperObjectOutput(
+                    id=oid, name=metric.object.name, metrics=[], subobjects=[]
+                )
+                self.objects[oid] = obj
+            if metric.subobject is None:
+                obj["metrics"].append(m)
+                continue
+            subobject = self.subobjects.get((oid, metric.subobject))
+            if subobject is None:
+                subobject = ObjectOutput(id=metric.subobject, metrics=[])
+                self.subobjects[(oid, metric.subobject)] = subobject
+                obj["subobjects"].append(subobject)
+            subobject["metrics"].append(m)
+
+    def build(self, commit: Commit) -> CommitOutput:
+        return CommitOutput(
+            id=str(commit.id),
+            author=parse_signature(commit.author),
+            commit_time=int(commit.commit_time),
+            commit_time_offset=int(commit.commit_time_offset),
+            committer=parse_signature(commit.committer),
+            message=str(commit.message),
+            parent_ids=[str(id) for id in commit.parent_ids],
+            metrics=self.metrics,
+            objects=list(self.objects.values()),
+        )
+
+
 def parse_commit(
     commit: Commit,
     toplevel: Iterable[AnalysisMetric],
     objectlevel: Iterable[AnalysisMetric],
     subobjectlevel: Iterable[AnalysisMetric],
 ) -> CommitOutput:
-    d: Dict[str, SuperObjectOutput] = {}
-    for metric in subobjectlevel:
-        m = Metric(name=metric.name, cached=metric.cached, value=metric.value)
-        subobjects = d.setdefault(
-            metric.object.oid,  # type: ignore
-            SuperObjectOutput(
-                id=metric.object.oid,  # type: ignore
-                name=metric.object.name,  # type: ignore
-                metrics=[],
-                subobjects=[],
-            ),
-        )["subobjects"]
-        v = [
-            subobject for subobject in subobjects if subobject["id"] == metric.subobject
-        ]
-        if v:
-            v[0]["metrics"].append(m)
-        else:
-            o = ObjectOutput(id=metric.subobject, metrics=[m])  # type: ignore
-            subobjects.append(o)
-    for metric in objectlevel:
-        d.setdefault(
-            metric.object.oid,  # type: ignore
-            SuperObjectOutput(
-                id=metric.object.oid,  # type: ignore
-                name=metric.object.name,  # type: ignore
-                metrics=[],
-                subobjects=[],
-            ),
-        )["metrics"].append(
-            Metric(name=metric.name, cached=metric.cached, value=metric.value)
-        )
-    return CommitOutput(
-        id=str(commit.id),
-        author=parse_signature(commit.author),
-        commit_time=int(commit.commit_time),
-        commit_time_offset=int(commit.commit_time_offset),
-        committer=parse_signature(commit.committer),
-        message=str(commit.message),
-        parent_ids=[str(id) for id in commit.parent_ids],
-        metrics=list(
-            Metric(name=m.name, cached=m.cached, value=m.value) for m in toplevel
-        ),
-        objects=list(d.values()),
-    )
+    output = OutputBuilder()
+    output.add(subobjectlevel)
+    output.add(objectlevel)
+    output.add(toplevel)
+    return output.build(commit)
 
 
 def format_output(output: CommitOutput) -> str:
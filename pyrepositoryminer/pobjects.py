@@ -9,6 +9,8 @@ from pygit2 import Tree as pTree
 
 
 class Object:
+    __slots__ = ("obj",)
+
     @classmethod
     def from_pobject(cls, obj: pObject) -> Object:
         if isinstance(obj, pBlob):
@@ -26,6 +28,11 @@ class Object:
     def id(self) -> str:
         return str(self.obj.id)
 
+    @property
+    def oid(self) -> bytes:
+        # the raw id, cheaper to get and to keep than the hex id of the output
+        return bytes(self.obj.id.raw)
+
     @property
     def name(self) -> str:
         if (s := self.obj.name) is None:
@@ -34,6 +41,8 @@ class Object:
 
 
 class Commit(Object):
+    __slots__ = ()
+
     @property
     def parents(self) -> Sequence[Commit]:
         return tuple(Commit(parent) for parent in self.obj.parents)
@@ -44,6 +53,8 @@ class Commit(Object):
 
 
 class Tree(Object):
+    __slots__ = ()
+
     def __iter__(self) -> Iterator[Object]:
         return (Object.from_pobject(obj) for obj in self.obj)
 
@@ -52,14 +63,32 @@ class Tree(Object):
 
 
 class Blob(Object):
+    __slots__ = ("_text", "__weakref__")
+    _text: str
+
     @property
     def is_binary(self) -> bool:
         return bool(self.obj.is_binary)
 
     @property
     def data(self) -> bytes:
+        # a copy of the contents on every access, prefer buffer if it will do
         return bytes(self.obj.data)
 
+    @property
+    def buffer(self) -> memoryview:
+        # the contents in the memory of the blob, without a copy
+        return memoryview(self.obj)
+
+    @property
+    def text(self) -> str:
+        # decoded once, for every metric that analyzes this blob of the commit
+        try:
+            return self._text
+        except AttributeError:
+            self._text = str(self.buffer, "utf-8")
+            return self._text
+
     @property
     def size(self) -> int:
         return int(self.obj.size)
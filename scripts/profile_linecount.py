@@ -0,0 +1,45 @@
+import asyncio
+from time import perf_counter
+from typing import Callable, List
+
+import uvloop
+
+BLOBS = [
+    bytes("\n".join(str(i) for i in range(size)), "utf-8")
+    for size in (0, 1, 10, 1000, 100000)
+] + [b"", b"\n", b"no newline", b"crlf\r\nlines\r\n"]
+ITERATIONS = 200
+
+
+async def run_async_wc(data: bytes) -> int:
+    p = await asyncio.create_subprocess_exec(
+        "wc", "-l", stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE
+    )
+    stdout, _ = await p.communicate(data)
+    return int(stdout)
+
+
+def subprocess_counts() -> List[int]:
+    return asyncio.get_event_loop().run_until_complete(
+        asyncio.gather(*(run_async_wc(data) for data in BLOBS))
+    )
+
+
+def native_counts() -> List[int]:
+    return [data.count(b"\n") for data in BLOBS]
+
+
+def measure(name: str, f: Callable[[], List[int]]) -> None:
+    start = perf_counter()
+    for _ in range(ITERATIONS):
+        f()
+    duration = perf_counter() - start
+    print(f"{name}: {duration / ITERATIONS / len(BLOBS) * 1e6:.2f} us per blob")
+
+
+if __name__ == "__main__":
+    uvloop.install()
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    assert native_counts() == subprocess_counts(), "the counts differ from wc -l"
+    measure("wc -l", subprocess_counts)
+    measure("native", native_counts)
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from pygit2 import (
+    GIT_FILEMODE_BLOB,
+    GIT_FILEMODE_BLOB_EXECUTABLE,
+    GIT_FILEMODE_LINK,
+    GIT_FILEMODE_TREE,
+    Oid,
+    Repository,
+    Signature,
+    init_repository,
+)
+from pytest import fixture
+
+SIGNATURE = Signature("Author", "author@example.com", 0, 0)
+
+A_PY = b"def f(x):\n    if x:\n        return 1\n    return 2\n"
+B_PY = b"import os\n\nprint(os.sep)\n"
+C_PY = b"class C:\n    def g(self):\n        return [i for i in range(3)]\n"
+README = b"# Title\n\nSome text.\n"
+MODES = {"run.sh": GIT_FILEMODE_BLOB_EXECUTABLE, "pkg/link": GIT_FILEMODE_LINK}
+
+
+def write_tree(repo: Repository, files: Dict[str, bytes], path: str = "") -> Oid:
+    builder = repo.TreeBuilder()
+    trees: Dict[str, Dict[str, bytes]] = {}
+    for name, data in files.items():
+        name, _, rest = name.partition("/")
+        if rest:
+            trees.setdefault(name, {})[rest] = data
+        else:
+            mode = MODES.get(path + name, GIT_FILEMODE_BLOB)
+            builder.insert(name, repo.create_blob(data), mode)
+    for name, tree in trees.items():
+        builder.insert(
+            name, write_tree(repo, tree, f"{path}{name}/"), GIT_FILEMODE_TREE
+        )
+    return builder.write()
+
+
+def commit(repo: Repository, files: Dict[str, bytes], parents: List[Oid]) -> Oid:
+    tree = write_tree(repo, files)
+    return repo.create_commit(None, SIGNATURE, SIGNATURE, "", tree, parents)
+
+
+@fixture
+def repository(tmp_path: Path) -> Tuple[Path, List[str]]:
+    """A bare repository with a rename, a symlink and a merge, and its commits.
+
+    The side branch changes the readme, the main branch changes b.py, and
+    the merge takes both.
+    """
+    path = tmp_path / "repository.git"
+    repo = init_repository(path, bare=True)
+    files = {
+        "a.py": A_PY,
+        "b.py": B_PY,
+        "pkg/c.py": C_PY,
+        "pkg/empty": b"",
+        "empty": b"",
+        "docs/README.md": README,
+    }
+    c0 = commit(repo, files, [])
+    files["a.py"] = A_PY + b"\n\ndef h():\n    return f(0)\n"
+    files["run.sh"] = b"#!/bin/sh\necho run\n"
+    c1 = commit(repo, files, [c0])
+    files["pkg/e.py"] = files.pop("pkg/c.py")
+    files["pkg/link"] = b"e.py"
+    c2 = commit(repo, files, [c1])
+    side = commit(repo, {**files, "docs/README.md": README + b"\nMore.\n"}, [c2])
+    files["b.py"] = B_PY.replace(b"os.sep", b"os.linesep")
+    main = commit(repo, files, [c2])
+    files["docs/README.md"] = README + b"\nMore.\n"
+    merge = commit(repo, files, [main, side])
+    return path, [str(oid) for oid in (c0, c1, c2, side, main, merge)]
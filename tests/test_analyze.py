@@ -0,0 +1,25 @@
+from pyrepositoryminer.analyze import iter_in_order, iter_rounds
+
+
+def test_iter_rounds_deal_batches() -> None:
+    assert list(iter_rounds(range(7), 2, 2)) == [((0, 2), (1, 3)), ((4, 6), (5,))]
+    # without a batch size the batches double, but never exceed max_in_flight
+    assert list(iter_rounds(range(10), 2)) == [
+        ((0,), (1,)),
+        ((2, 4), (3, 5)),
+        ((6, 8), (7, 9)),
+    ]
+    assert list(iter_rounds(range(5), 3, 4, max_in_flight=2)) == [
+        ((0,), (1,)),
+        ((2,), (3,)),
+        ((4,),),
+    ]
+
+
+def test_iter_in_order() -> None:
+    results = [(2, "c"), (0, "a"), (3, "d"), (1, "b"), (4, "e")]
+    assert list(iter_in_order(results)) == sorted(results)
+    # a result is yielded as soon as the results before it arrived
+    pending = iter(results)
+    assert next(iter_in_order(pending)) == (0, "a")
+    assert next(pending) == (3, "d")
@@ -0,0 +1,86 @@
+from threading import Thread
+from typing import Dict, List, Tuple
+
+from pyrepositoryminer.metrics.cache import (
+    BLOOM,
+    LRU,
+    CacheStats,
+    Key,
+    Memo,
+    OidCache,
+    OidLedger,
+    decode_key,
+)
+
+A, B, C, D = (bytes([i]) * 20 for i in range(4))
+CLAIMS: Tuple[List[Key], ...] = ([A, B], [B, C, C], [], [A, (D, "d")])
+
+
+def test_ledger_claims_in_input_order() -> None:
+    cache = OidCache()
+    expected = [cache.claim(oids) for oids in CLAIMS]
+    ledger = OidLedger()
+    flags: Dict[int, List[bool]] = {}
+
+    def claim(index: int) -> None:
+        if CLAIMS[index]:
+            flags[index] = ledger.claim("ns", index, CLAIMS[index])
+        else:  # an index that never claims must not block the others
+            flags[index] = []
+        ledger.finish(index)
+
+    threads = [Thread(target=claim, args=(i,)) for i in reversed(range(len(CLAIMS)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert [flags[i] for i in range(len(CLAIMS))] == expected
+
+
+def test_ledger_restores_snapshot() -> None:
+    ledger = OidLedger()
+    for index, oids in enumerate(CLAIMS):
+        ledger.claim("ns", index, oids)
+        ledger.finish(index)
+    snapshot = ledger.snapshot(0, 2)
+    assert sorted(snapshot["ns"]) == [A.hex(), B.hex(), C.hex()]
+    restored = OidLedger()
+    restored.restore(2, snapshot)
+    assert restored.claim("ns", 2, [C, D]) == [True, False]
+    assert ledger.snapshot(3, 4)["ns"] == [f"{D.hex()}:d"]
+    assert decode_key(f"{D.hex()}:d") == (D, "d")
+
+
+def test_ledger_bounded_backends() -> None:
+    lru = OidLedger(LRU, 2)
+    assert lru.claim("ns", 0, [A, B, A, C, B]) == [False, False, True, False, False]
+    assert lru.stats()["ns"][:3] == (1, 4, 2)
+    bloom = OidLedger(BLOOM, 100)
+    assert bloom.claim("ns", 0, [A, B, A, (D, "d"), (D, "d"), D]) == [
+        False,
+        False,
+        True,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_memo_evicts_least_recently_used() -> None:
+    memo: Memo[bytes, int] = Memo()
+    memo.size = 2
+    memo[A], memo[B] = 0, 1
+    assert memo.get(A) == 0
+    memo[C] = 2
+    assert (memo.get(A), memo.get(B), memo.get(C), len(memo)) == (0, None, 2, 2)
+    assert memo.stats()[:3] == (3, 1, 2)
+
+
+def test_ledger_sums_memo_reports() -> None:
+    ledger = OidLedger()
+    ledger.claim("ns", 0, [A, A])
+    ledger.report(1, {"memo": CacheStats(1, 2, 3, 4)})
+    ledger.report(2, {"memo": CacheStats(1, 0, 1, 1)})
+    ledger.report(1, {"memo": CacheStats(2, 2, 3, 4)})  # replaces the first
+    assert ledger.stats()["ns"][:3] == (1, 1, 1)
+    assert ledger.stats()["memo"] == (3, 2, 4, 5)
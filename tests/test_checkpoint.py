@@ -0,0 +1,17 @@
+from pathlib import Path
+
+from pyrepositoryminer.checkpoint import Checkpoint
+
+
+def test_checkpoint_roundtrip(tmp_path: Path) -> None:
+    checkpoint = Checkpoint(tmp_path / "checkpoint.db")
+    assert checkpoint.settings(metrics=["raw"]) is None
+    checkpoint.save(["c0", "c1"], {"visitor:oid_cache": ["a", "b"]})
+    checkpoint.save(["c2"], {"visitor:oid_cache": ["c"], "raw:cache": []})
+    checkpoint.close()
+    checkpoint = Checkpoint(tmp_path / "checkpoint.db")
+    assert checkpoint.done == 3
+    assert checkpoint.commit_ids() == ["c0", "c1", "c2"]
+    assert sorted(checkpoint.caches()["visitor:oid_cache"]) == ["a", "b", "c"]
+    assert checkpoint.settings(metrics=["raw"]) is None
+    assert checkpoint.settings(metrics=["loc"]) is not None
@@ -0,0 +1,47 @@
+from os import X_OK, access, readlink
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from pygit2 import Repository
+from pytest import mark
+
+from pyrepositoryminer.metrics.context import CommitContext
+from pyrepositoryminer.metrics.dir.main import DirVisitor
+from pyrepositoryminer.metrics.paths import PathFilter
+from pyrepositoryminer.pobjects import Commit
+
+
+def snapshot(directory: str) -> Dict[str, Tuple[Any, ...]]:
+    root = Path(directory)
+    entries: Dict[str, Tuple[Any, ...]] = {}
+    for path in root.rglob("*"):
+        if path.is_symlink():
+            entries[str(path.relative_to(root))] = ("link", readlink(path))
+        elif path.is_dir():
+            entries[str(path.relative_to(root))] = ("dir",)
+        else:
+            entries[str(path.relative_to(root))] = (
+                path.read_bytes(),
+                access(path, X_OK),
+            )
+    return entries
+
+
+@mark.parametrize("include", ((), ("*.py", "*.sh")))
+def test_persistent_worktree_matches_checkout(
+    repository: Tuple[Path, List[str]], tmp_path: Path, include: Sequence[str]
+) -> None:
+    path, commit_ids = repository
+    repo = Repository(str(path))
+    paths = PathFilter(include) if include else None
+    persistent = DirVisitor(repo, str(tmp_path), persistent=True)
+    # backwards as well, to remove the files added going forwards
+    for commit_id in (*commit_ids, *reversed(commit_ids)):
+        commit = Commit(repo[commit_id])
+        moved = persistent(commit, CommitContext(commit, paths))
+        visitor = DirVisitor(repo, str(tmp_path))
+        checked_out = visitor(commit, CommitContext(commit, paths))
+        assert moved is not None and checked_out is not None
+        assert snapshot(moved.path) == snapshot(checked_out.path)
+        visitor.close()
+    persistent.reset()
@@ -0,0 +1,15 @@
+from pyrepositoryminer.metrics.languages import LineCounts, count_lines, get_language
+
+
+def test_count_lines() -> None:
+    c = get_language("main.C")
+    assert c is not None and c.name == "C"
+    assert count_lines(
+        b"int a; /* open\n\n still */ int b;\n/* a */ /* b */\n// c\n", c
+    ) == LineCounts(code=2, comments=2, blanks=1)
+    python = get_language("setup.py")
+    assert python is not None
+    assert count_lines(b'"""Doc\n"""\nx = 1  # c\n', python) == LineCounts(1, 2, 0)
+    assert count_lines(b"", python) == LineCounts(0, 0, 0)
+    assert get_language("Makefile") is not None
+    assert get_language("README") is None
@@ -0,0 +1,33 @@
+from asyncio import run
+from pathlib import Path
+
+from pygit2 import init_repository
+
+from pyrepositoryminer.metrics.nativeblob.linelengthsummary import Linelengthsummary
+from pyrepositoryminer.metrics.structs import NativeBlobMetricInput, ObjectIdentifier
+from pyrepositoryminer.pobjects import Blob
+from tests.conftest import A_PY, README
+
+
+def test_summarize() -> None:
+    summary = Linelengthsummary().summarize([0, 10, 85, 101, 250, 20])
+    assert summary["lines"] == 6
+    assert summary["max"] == 250
+    assert summary["percentiles"] == {"50": 20, "90": 250, "99": 250}
+    assert summary["histogram"] == [2, 1, 0, 0, 1, 1, 0, 0, 0, 0, 1]
+    assert summary["over"] == {"80": 3, "100": 2, "120": 1}
+
+
+def test_analyze_batch(tmp_path: Path) -> None:
+    repo = init_repository(tmp_path / "repository.git", bare=True)
+    metric = Linelengthsummary()
+    tups = [
+        NativeBlobMetricInput(False, path, Blob(repo[repo.create_blob(data)]))
+        for path, data in (("a.py", A_PY), ("README.md", README))
+    ]
+    results = [list(metrics) for metrics in run(metric.analyze_batch(tups))]
+    assert [[m.object for m in metrics] for metrics in results] == [
+        [ObjectIdentifier(tup.blob.id, tup.path)] for tup in tups
+    ]
+    assert [metrics[0].value["lines"] for metrics in results] == [4, 3]
+    assert results[1] == list(run(metric.analyze(tups[1])))
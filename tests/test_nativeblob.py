@@ -0,0 +1,43 @@
+from asyncio import run
+from pathlib import Path
+
+from pygit2 import init_repository
+from radon.metrics import mi_visit
+
+from pyrepositoryminer.metrics.nativeblob.main import NativeBlobVisitor
+from pyrepositoryminer.metrics.nativeblob.maintainability import Maintainability
+from pyrepositoryminer.metrics.structs import NativeBlobMetricInput
+from pyrepositoryminer.pobjects import Blob, Object
+from tests.conftest import A_PY, B_PY, C_PY, commit
+
+
+def test_visitor_yields_first_sightings_first(tmp_path: Path) -> None:
+    repo = init_repository(tmp_path / "repository.git", bare=True)
+    files = {"x/a.py": A_PY, "x/sub/b.py": B_PY, "y/a.py": A_PY, "y/sub/b.py": B_PY}
+    oid = commit(repo, files, [])
+    tups = list(NativeBlobVisitor()(Object.from_pobject(repo[oid])))
+    assert sorted(tup.path for tup in tups) == sorted(files)
+    seen = set()
+    for tup in tups:
+        assert tup.is_cached == (tup.blob.oid in seen)
+        seen.add(tup.blob.oid)
+
+
+DOCUMENTED_PY = b'''"""A module docstring
+over two lines."""
+# a comment
+
+
+def g(x):
+    """A function docstring."""
+    return [i * x for i in range(x) if i % 2] or None
+'''
+
+
+def test_maintainability_equals_radon(tmp_path: Path) -> None:
+    repo = init_repository(tmp_path / "repository.git", bare=True)
+    metric = Maintainability()
+    for data in (A_PY, B_PY, C_PY, DOCUMENTED_PY):
+        blob = Blob(repo[repo.create_blob(data)])
+        (result,) = run(metric.analyze(NativeBlobMetricInput(False, "a.py", blob)))
+        assert result.value == mi_visit(data.decode(), multi=True)
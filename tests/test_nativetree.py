@@ -0,0 +1,24 @@
+from pathlib import Path
+from typing import List, Tuple
+
+from pygit2 import Repository
+from pytest import MonkeyPatch
+
+from pyrepositoryminer.metrics.cache import Memo
+from pyrepositoryminer.metrics.nativetree.cacherate import CountAggregate
+from pyrepositoryminer.metrics.nativetree.loc import LocAggregate
+from pyrepositoryminer.pobjects import Tree
+
+
+def test_aggregate_recomputes_evicted_trees(
+    repository: Tuple[Path, List[str]], monkeypatch: MonkeyPatch
+) -> None:
+    path, commit_ids = repository
+    repo = Repository(path)
+    trees = [Tree(repo[commit_id].tree) for commit_id in commit_ids]
+    expected = [(LocAggregate()(tree), CountAggregate()(tree)) for tree in trees]
+    monkeypatch.setattr(Memo, "size", 1)
+    loc, counts = LocAggregate(), CountAggregate()
+    assert [(loc(tree), counts(tree)) for tree in trees] == expected
+    assert expected[0] == (19, (2, 6, 0))
+    assert len(loc.trees) == len(loc.blobs) == 1
@@ -0,0 +1,38 @@
+from typing import Dict, Tuple
+
+from pygit2 import Oid
+
+from pyrepositoryminer.metrics.paths import PathFilter, SizeFilter
+
+
+def test_path_filter() -> None:
+    paths = PathFilter(include=("*.py",), exclude=("vendor", "src/generated/"))
+    assert paths.selects("src", is_dir=True)
+    assert not paths.selects("a/vendor", is_dir=True)
+    assert not paths.selects("src/generated", is_dir=True)
+    assert paths.selects("lib/generated", is_dir=True)
+    assert paths.selects("src/main.py")
+    assert not paths.selects("src/main.js")
+    assert paths.selects_file("lib/generated/main.py")
+    assert not paths.selects_file("lib/vendor/main.py")
+    assert not paths.selects_file("src/generated/main.py")
+
+
+class Odb:
+    def __init__(self, sizes: Dict[Oid, int]) -> None:
+        self.sizes = sizes
+        self.reads = 0
+
+    def read_header(self, oid: Oid) -> Tuple[int, int]:
+        self.reads += 1
+        return 3, self.sizes[oid]
+
+
+def test_size_filter() -> None:
+    a, b = Oid(hex="a" * 40), Oid(hex="b" * 40)
+    odb = Odb({a: 10, b: 11})
+    sizes = SizeFilter(odb, 10)
+    assert sizes.selects(a)
+    assert not sizes.selects(b)
+    assert not sizes.selects(b)
+    assert odb.reads == 2
@@ -0,0 +1,20 @@
+from asyncio import TimeoutError, gather, run  # pylint: disable=redefined-builtin
+from time import perf_counter
+
+from pytest import raises
+
+from pyrepositoryminer.metrics.processes import ProcessExecutor
+
+
+def test_process_executor() -> None:
+    async def main() -> None:
+        executor = ProcessExecutor(limit=2, timeout=2.0)
+        assert await executor.run("cat", stdin=b"a\nb\n") == b"a\nb\n"
+        start = perf_counter()
+        await gather(*(executor.run("sleep", "0.2") for _ in range(4)))
+        assert perf_counter() - start >= 0.4  # two rounds of two processes
+        executor = ProcessExecutor(timeout=0.1)
+        with raises(TimeoutError):
+            await executor.run("sleep", "5")
+
+    run(main())
@@ -1,7 +1,13 @@
+from json import dumps, loads
+from pathlib import Path
+from typing import Any, Iterable, List, Sequence, Tuple
+
+from pygit2 import Commit, Repository, init_repository
 from pytest import mark
 from typer.testing import CliRunner
 
 from pyrepositoryminer import app
+from tests.conftest import A_PY, commit
 
 runner = CliRunner()
 
@@ -32,3 +38,208 @@ def test_command_initializes(command: str) -> None:
     assert "Usage:" in result.stdout
     assert "Arguments:" in result.stdout
     assert "Options:" in result.stdout
+
+
+def analyze(repository: Path, commit_ids: Sequence[str], *args: str) -> List[Any]:
+    ids = repository.parent / "ids.txt"
+    ids.write_text("\n".join(commit_ids) + "\n")
+    result = runner.invoke(
+        app, ("analyze", str(repository), *args, "--commits", str(ids))
+    )
+    assert result.exit_code == 0, result.output
+    return [loads(line) for line in result.stdout.splitlines()]
+
+
+def canonical(commits: List[Any]) -> List[Any]:
+    # the engines differ in the order of the metrics, and in the path that
+    # names a blob occurring at several paths of a commit
+    def sort(items: Iterable[Any]) -> List[Any]:
+        return sorted(items, key=lambda item: dumps(item, sort_keys=True))
+
+    return [
+        {
+            **commit,
+            "metrics": sort(commit["metrics"]),
+            "objects": sort(
+                {
+                    "id": o["id"],
+                    "metrics": sort(o["metrics"]),
+                    "subobjects": sort(
+                        {"id": s["id"], "metrics": sort(s["metrics"])}
+                        for s in o["subobjects"]
+                    ),
+                }
+                for o in commit["objects"]
+            ),
+        }
+        for commit in commits
+    ]
+
+
+@mark.parametrize("workers", ("1", "2"))
+def test_blob_engine_matches_commit_engine(
+    repository: Tuple[Path, List[str]], workers: str
+) -> None:
+    path, commit_ids = repository
+    metrics = ("blobcount", "complexity", "linecount", "loc", "raw")
+    expected = analyze(path, commit_ids, *metrics)
+    assert len(expected) == len(commit_ids)
+    assert canonical(
+        analyze(path, commit_ids, *metrics, "--engine", "blob", "--workers", workers)
+    ) == canonical(expected)
+
+
+def touched(commit: Any) -> Tuple[Any, List[Tuple[str, int, int]]]:
+    # the counts per file, a file is named by the path its blob was output at
+    return commit["metrics"][0]["value"], sorted(
+        (o["name"], m["value"]["added"], m["value"]["deleted"])
+        for o in commit["objects"]
+        for m in o["metrics"]
+    )
+
+
+@mark.parametrize(
+    "args,rename,merge",
+    (
+        (
+            (),
+            # the deleted and the added file of a rename share their blob
+            (4, 3, [("pkg/c.py", 0, 3), ("pkg/c.py", 3, 0), ("pkg/link", 1, 0)]),
+            # a merge is diffed to both parents
+            (3, 1, [("b.py", 1, 1), ("docs/README.md", 2, 0)]),
+        ),
+        (
+            ("--first-parent", "--find-renames"),
+            (1, 0, [("pkg/e.py", 0, 0), ("pkg/link", 1, 0)]),
+            (2, 0, [("docs/README.md", 2, 0)]),
+        ),
+    ),
+)
+def test_touchedlinecount(
+    repository: Tuple[Path, List[str]],
+    args: Tuple[str, ...],
+    rename: Tuple[int, int, List[Tuple[str, int, int]]],
+    merge: Tuple[int, int, List[Tuple[str, int, int]]],
+) -> None:
+    path, commit_ids = repository
+    commits = analyze(path, commit_ids, "touchedlinecount", *args)
+    assert touched(commits[1]) == (
+        {"added": 6, "deleted": 0},
+        [("a.py", 4, 0), ("run.sh", 2, 0)],
+    )
+    added, deleted, files = rename
+    assert touched(commits[2]) == ({"added": added, "deleted": deleted}, files)
+    assert touched(commits[4]) == ({"added": 1, "deleted": 1}, [("b.py", 1, 1)])
+    added, deleted, files = merge
+    assert touched(commits[5]) == ({"added": added, "deleted": deleted}, files)
+
+
+@mark.parametrize("oid_cache", ("lru", "bloom"))
+def test_checkpoint_requires_unbounded_cache(
+    repository: Tuple[Path, List[str]], oid_cache: str
+) -> None:
+    path, _ = repository
+    checkpoint = path.parent / "checkpoint.db"
+    args = ("--checkpoint", str(checkpoint), "--oid-cache", oid_cache)
+    result = runner.invoke(app, ("analyze", str(path), "loc", *args), input="")
+    assert result.exit_code == 1
+    assert "unbounded oid cache" in result.output
+    assert not checkpoint.exists()
+
+
+@mark.parametrize("engine", ("commit", "blob"))
+def test_batch_size_must_be_positive(
+    repository: Tuple[Path, List[str]], engine: str
+) -> None:
+    path, _ = repository
+    args = ("--engine", engine, "--batch-size", "0")
+    result = runner.invoke(app, ("analyze", str(path), "loc", *args), input="")
+    assert result.exit_code == 2
+    assert "--batch-size" in result.output
+
+
+def test_fill_cached_requires_store(repository: Tuple[Path, List[str]]) -> None:
+    path, commit_ids = repository
+    result = runner.invoke(
+        app, ("analyze", str(path), "loc", "--fill-cached"), input=commit_ids[0]
+    )
+    assert result.exit_code == 1
+    assert "requires a store" in result.output
+    assert analyze(
+        path,
+        commit_ids[:1],
+        "loc",
+        "--fill-cached",
+        "--store",
+        str(path.parent / "s.db"),
+    )
+
+
+@mark.parametrize(
+    "args",
+    (
+        ("--workers", "2"),
+        ("--workers", "3", "--batch-size", "2"),
+        ("--workers", "2", "--max-in-flight", "1"),
+    ),
+)
+def test_output_follows_input_order(
+    repository: Tuple[Path, List[str]], args: Tuple[str, ...]
+) -> None:
+    path, commit_ids = repository
+    commit_ids = [commit_ids[i] for i in (3, 0, 5, 1, 4, 2)]
+    metrics = ("blobcount", "cacherate", "loc", "touchedlinecount")
+    expected = canonical(analyze(path, commit_ids, *metrics))
+    assert [commit["id"] for commit in expected] == commit_ids
+    assert canonical(analyze(path, commit_ids, *metrics, *args)) == expected
+    unordered = analyze(path, commit_ids, *metrics, *args, "--unordered")
+    assert sorted(commit.pop("index") for commit in unordered) == list(range(6))
+    assert sorted(canonical(unordered), key=dumps) == sorted(expected, key=dumps)
+
+
+def test_commits_state_skips_listed_commits(repository: Tuple[Path, List[str]]) -> None:
+    path, (c0, c1, c2, side, main, merge) = repository
+    repo = Repository(path)
+    state = path.parent / "state.json"
+
+    def commits(*branches: str) -> List[str]:
+        names = path.parent / "branches.txt"
+        names.write_text("\n".join(branches) + "\n")
+        args = ("commits", str(path), str(names), "--state", str(state))
+        result = runner.invoke(app, args)
+        assert result.exit_code == 0, result.output
+        commit_ids: List[str] = result.stdout.split()
+        return commit_ids
+
+    repo.branches.local.create("main", repo[c1].peel(Commit))
+    assert commits("main") == [c0, c1]
+    repo.branches.local.create("main", repo[merge].peel(Commit), force=True)
+    repo.branches.local.create("side", repo[side].peel(Commit))
+    assert sorted(commits("main", "side")) == sorted([c2, main, merge, side])
+    assert not commits("main", "side")
+
+
+@mark.parametrize(
+    "args,copied",
+    (
+        ((), ("b.py", 5, 0)),
+        # a copy is diffed to the file it was copied from
+        (("--find-copies",), ("b.py", 1, 0)),
+        # a copy must be as similar as the threshold
+        (("--find-copies", "--copy-threshold", "100"), ("b.py", 5, 0)),
+    ),
+)
+def test_touchedlinecount_find_copies(
+    tmp_path: Path, args: Tuple[str, ...], copied: Tuple[str, int, int]
+) -> None:
+    # libgit2 finds the copies of files modified by the same commit
+    path = tmp_path / "copies.git"
+    repo = init_repository(path, bare=True)
+    c0 = commit(repo, {"a.py": A_PY}, [])
+    c1 = commit(repo, {"a.py": A_PY + b"\nf(1)\n", "b.py": A_PY + b"#\n"}, [c0])
+    (output,) = analyze(path, [str(c1)], "touchedlinecount", *args)
+    added, deleted = copied[1] + 2, copied[2]
+    assert touched(output) == (
+        {"added": added, "deleted": deleted},
+        [("a.py", 2, 0), copied],
+    )
@@ -0,0 +1,67 @@
+from asyncio import run
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterable, List, Sequence
+
+from pyrepositoryminer.metrics.nativeblob.main import NativeBlobMetric
+from pyrepositoryminer.metrics.store import ResultStore
+from pyrepositoryminer.metrics.structs import (
+    Metric,
+    NativeBlobMetricInput,
+    ObjectIdentifier,
+)
+
+
+def test_store_roundtrip(tmp_path: Path) -> None:
+    metrics = [
+        Metric("raw", {"loc": 4}, False, ObjectIdentifier("abc", "a.py")),
+        Metric("complexity", 2, False, ObjectIdentifier("abc", "a.py"), "f"),
+    ]
+    store = ResultStore(tmp_path / "store.db")
+    assert store.get("raw", "1", "abc") is None
+    store.put("raw", "1", "abc", metrics)
+    assert store.get("raw", "1", "abc") == metrics
+    store.close()
+    store = ResultStore(tmp_path / "store.db")
+    assert store.get("raw", "1", "abc") == metrics
+    assert store.get("raw", "2", "abc") is None
+
+
+def test_batch_uses_store(tmp_path: Path) -> None:
+    class Size(NativeBlobMetric):
+        filter = None  # type: ignore
+        batch_size = 2
+        batches: List[int] = []
+
+        async def analyze(self, tup: NativeBlobMetricInput) -> Iterable[Metric]:
+            return (await self.analyze_batch((tup,)))[0]
+
+        async def analyze_batch(
+            self, tups: Sequence[NativeBlobMetricInput]
+        ) -> List[Iterable[Metric]]:
+            self.batches.append(len(tups))
+            return [
+                [
+                    Metric(
+                        self.name,
+                        len(tup.path),
+                        False,
+                        ObjectIdentifier(tup.blob.id, tup.path),
+                    )
+                ]
+                for tup in tups
+            ]
+
+    tups = [
+        NativeBlobMetricInput(False, "a", SimpleNamespace(id="1")),  # type: ignore
+        NativeBlobMetricInput(True, "ab", SimpleNamespace(id="1")),  # type: ignore
+        NativeBlobMetricInput(False, "abc", SimpleNamespace(id="2")),  # type: ignore
+    ]
+    metric = Size()
+    metric.store = ResultStore(tmp_path / "store.db")
+    first = run(metric.batch(tups))
+    assert metric.batches == [2]
+    assert run(metric.batch(tups)) == first
+    assert metric.batches == [2]
+    assert first == [m for tup in tups for m in run(metric(tup))]
+    assert [m.value for m in first] == [1, None, 3]